@@ -0,0 +1,71 @@
+import os
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Iterable
+
+import storage
+
+# ZIP archives built while they are sent. zipfile writes to an unseekable
+# sink, so it puts each member's CRC and sizes in a data descriptor after the
+# data instead of seeking back into the header; whatever it has written is
+# handed to the client after every chunk read from storage. Memory stays at
+# one storage chunk whatever the archive size, and nothing touches the disk.
+# Members are STORED: office files and PDFs are already compressed.
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+class _Sink:
+    # Write-only, no tell()/seek(): zipfile switches to streaming mode
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def unique_name(filename: str, taken: set) -> str:
+    base, ext = os.path.splitext(os.path.basename((filename or "").replace("\\", "/")) or "document")
+    name, n = base + ext, 1
+    while name in taken:
+        n += 1
+        name = f"{base} ({n}){ext}"
+    taken.add(name)
+    return name
+
+
+def _date_time(moment: datetime):
+    return max(moment.timetuple()[:6], ZIP_EPOCH)
+
+
+async def stream_archive(entries: Iterable) -> AsyncIterator[bytes]:
+    # entries: rows with filename, file_path and uploaded_at. Files missing
+    # from storage are left out, since the response has already started.
+    sink = _Sink()
+    taken = set()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+        for entry in entries:
+            stat = await storage.backend.stat(entry.file_path)
+            if stat is None:
+                continue
+            moment = entry.uploaded_at or datetime.utcfromtimestamp(stat.mtime)
+            info = zipfile.ZipInfo(unique_name(entry.filename, taken), date_time=_date_time(moment))
+            info.compress_type = zipfile.ZIP_STORED
+            # Known up front, so zipfile picks ZIP64 records for members over 4 GB
+            info.file_size = stat.size
+            with archive.open(info, "w") as member:
+                async for chunk in storage.backend.stream(entry.file_path):
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # Last data descriptor and the central directory
+    yield sink.drain()
@@ -1,13 +1,20 @@
+import asyncio
+import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-import bcrypt
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, get_async_db
 import models
+import repository
+from cache import LRUTTLCache
+from config import settings
+# Re-exported so existing imports keep working
+from passwords import verify_password, get_password_hash
 
 # Configuration
 SECRET_KEY = "votre_cle_secrete_tres_longue_et_complexe_a_changer_en_production"
@@ -17,20 +24,60 @@ ADMIN_CODE = "ADMIN2024"
 
 security = HTTPBearer()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    try:
-        # bcrypt requires bytes
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8')[:72],
-            hashed_password.encode('utf-8')
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Principal:
+    # Read-only snapshot of the authenticated user, cheap to cache between requests
+    id: int
+    email: str
+    full_name: str
+    role: models.UserRole
+    team_id: Optional[int]
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            team_id=user.team_id,
+            is_active=user.is_active,
+            created_at=user.created_at,
         )
-    except Exception:
-        return False
 
-def get_password_hash(password: str) -> str:
-    # Bcrypt has a 72 byte limit
-    password_bytes = password.encode('utf-8')[:72]
-    return bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode('utf-8')
+principal_cache = LRUTTLCache("principal", settings.principal_cache_size, settings.principal_cache_ttl)
+
+_users_version = None
+
+def invalidate_principal(user_id: int):
+    # Must be called after any change to a user's role, team, status or profile.
+    # Only clears this worker's entry; the others notice through
+    # refresh_principals().
+    principal_cache.invalidate(user_id)
+
+async def refresh_principals():
+    # Drops the whole cache when the users table changed since the last
+    # check: admin changes are rare, and (row count, latest update) is one
+    # cheap aggregate instead of a lookup per cached request
+    global _users_version
+    async with AsyncSessionLocal() as db:
+        version = tuple((await db.execute(repository.users_version_query())).one())
+    if version != _users_version:
+        principal_cache.clear()
+        _users_version = version
+
+async def watch_principals(interval: float):
+    # Background loop started by main.py in every worker
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_principals()
+        except Exception:
+            logger.exception("Principal cache refresh failed")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -49,9 +96,9 @@ def decode_token(token: str):
     except JWTError:
         return None
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     token = credentials.credentials
     payload = decode_token(token)
@@ -78,16 +125,22 @@ def get_current_user(
             detail="Invalid token format",
         )
     
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    
+    user = await db.get(models.User, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
     
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.set(user_id, principal)
+    return principal
 
-def get_current_admin(current_user: models.User = Depends(get_current_user)):
+async def get_current_admin(current_user: Principal = Depends(get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
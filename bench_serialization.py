@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import orjson
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base
+import models
+import repository
+import schemas
+from serializers import dump_list, list_adapter
+
+# Usage: python bench_serialization.py [rows] [rounds]
+# Times a team documents listing end to end (query + serialization) the way
+# the handlers used to do it (ORM rows -> dicts -> response_model validation
+# -> stdlib json) against the fast path (flat rows validated once from
+# attributes and written by pydantic-core), plus orjson rendering of the old
+# path for reference.
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+ROUNDS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.Team.__table__.insert(), [{"name": "Team 1"}])
+        conn.execute(models.User.__table__.insert(), [
+            {"email": f"user{i}@example.com", "password_hash": "x", "full_name": f"User {i}", "team_id": 1}
+            for i in range(20)
+        ])
+        conn.execute(models.Document.__table__.insert(), [
+            {"team_id": 1, "filename": f"doc{i}.pdf", "file_path": f"uploads/doc{i}.pdf", "uploaded_by": i % 20 + 1}
+            for i in range(ROWS)
+        ])
+
+
+def old_path(db, render):
+    rows = db.execute(repository.documents_with_uploader_query().where(models.Document.team_id == 1))
+    dicts = [repository.document_dict(document, uploader_name) for document, uploader_name in rows]
+    # What FastAPI does with a response_model: validate the dicts, dump to JSON-able python, render
+    adapter = list_adapter(schemas.DocumentResponse)
+    return render(adapter.dump_python(adapter.validate_python(dicts), mode="json"))
+
+
+def stdlib_render(content):
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast_path(db):
+    rows = db.execute(repository.team_documents_query(1)).all()
+    return dump_list(schemas.DocumentResponse, rows)
+
+
+def best_of(engine, func):
+    timings = []
+    for _ in range(ROUNDS):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            body = func(db)
+            timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+
+def main():
+    print(f"Team documents listing: {ROWS} rows, best of {ROUNDS}\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        seed(engine)
+        results = [
+            ("dicts + stdlib json", best_of(engine, lambda db: old_path(db, stdlib_render))),
+            ("dicts + orjson", best_of(engine, lambda db: old_path(db, orjson.dumps))),
+            ("rows + pydantic-core", best_of(engine, fast_path)),
+        ]
+        engine.dispose()
+    baseline = results[0][1][0]
+    for label, (seconds, size) in results:
+        print(f"   {label:22s} {seconds * 1000:8.1f} ms   {size / 1024:8.0f} KiB   x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
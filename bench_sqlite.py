@@ -0,0 +1,88 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from database import Base, create_sqlite_engines, make_async_sessionmaker
+import models
+
+# Usage: python bench_sqlite.py [seconds] [concurrency]
+# Runs the same mixed read/write workload against a default SQLite setup and
+# against the tuned mode (WAL + pragmas + serialized writer), then prints
+# throughput for both.
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+WRITE_RATIO = 0.2
+
+
+def seed(sync_engine):
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(models.Team.__table__.insert(), [{"name": f"Team {i}"} for i in range(1, 4)])
+        conn.execute(models.User.__table__.insert(), [
+            {"email": f"user{i}@example.com", "password_hash": "x", "full_name": f"User {i}", "team_id": i % 3 + 1}
+            for i in range(30)
+        ])
+        conn.execute(models.Document.__table__.insert(), [
+            {"team_id": i % 3 + 1, "filename": f"doc{i}.pdf", "file_path": f"uploads/doc{i}.pdf", "uploaded_by": i % 30 + 1}
+            for i in range(3000)
+        ])
+
+
+async def worker(session_factory, deadline, counts):
+    while time.perf_counter() < deadline:
+        team_id = random.randint(1, 3)
+        try:
+            async with session_factory() as db:
+                if random.random() < WRITE_RATIO:
+                    db.add(models.Document(
+                        team_id=team_id, filename="new.pdf", file_path="uploads/new.pdf", uploaded_by=1
+                    ))
+                    await db.commit()
+                    counts["writes"] += 1
+                else:
+                    rows = await db.execute(
+                        select(models.Document.id, models.User.full_name)
+                        .join(models.User, models.User.id == models.Document.uploaded_by)
+                        .where(models.Document.team_id == team_id)
+                        .limit(100)
+                    )
+                    rows.all()
+                    counts["reads"] += 1
+        except OperationalError:
+            counts["errors"] += 1
+
+
+async def run(tuned: bool, path: str):
+    sync_engine, reader_engine, writer_engine = create_sqlite_engines(path, tuned)
+    seed(sync_engine)
+    session_factory = make_async_sessionmaker(reader_engine, writer_engine)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + DURATION
+    await asyncio.gather(*[worker(session_factory, deadline, counts) for _ in range(CONCURRENCY)])
+    await reader_engine.dispose()
+    if writer_engine is not None:
+        await writer_engine.dispose()
+    sync_engine.dispose()
+    return counts
+
+
+def main():
+    print(f"Mixed workload: {CONCURRENCY} concurrent sessions, {WRITE_RATIO:.0%} writes, {DURATION:.0f} s per mode\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (("default", False), ("tuned", True)):
+            counts = asyncio.run(run(tuned, os.path.join(tmp, f"{label}.db")))
+            print(
+                f"   {label:8s} reads/s: {counts['reads'] / DURATION:8.1f}   "
+                f"writes/s: {counts['writes'] / DURATION:8.1f}   "
+                f"locked errors: {counts['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
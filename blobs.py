@@ -0,0 +1,135 @@
+import hashlib
+from typing import Optional
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import storage
+import uploads
+
+# Content-addressed document storage. Each distinct content is stored once
+# under the storage key blobs/<aa>/<sha256> and shared by every document with
+# those bytes through a reference count. The upload is hashed before anything
+# is written, so a duplicate costs one read of the request body and no write.
+# The bytes are written (and verified) before the reference is taken: a
+# content-addressed write is idempotent, and the upsert then holds the write
+# transaction only for the rest of the request's statements, not for the
+# length of a file write or S3 upload. Files whose last reference is gone
+# are left to the reconciler (see reconcile.py), which can tell them from a
+# blob being uploaded again.
+
+
+def blob_key(sha256: str) -> str:
+    # Two-character fan-out keeps directories small
+    return f"blobs/{sha256[:2]}/{sha256}"
+
+
+async def hash_upload(file: UploadFile, max_size: int):
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(uploads.CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise uploads.too_large(max_size)
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+def _upsert(dialect_name: str, sha256: str, key: str, size: int):
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = insert(models.Blob).values(sha256=sha256, path=key, size=size, ref_count=1)
+    # Concurrent first uploads of the same content both land here; one inserts, the other increments
+    return statement.on_conflict_do_update(
+        index_elements=[models.Blob.sha256],
+        set_={"ref_count": models.Blob.ref_count + 1},
+    )
+
+
+def hash_file(path: str):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(uploads.CHUNK_SIZE), b""):
+            size += len(chunk)
+            digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+async def _is_stored(key: str, size: int) -> bool:
+    # A leftover file of another size (e.g. cut short) is written again
+    stat = await storage.backend.stat(key)
+    return stat is not None and stat.size == size
+
+
+async def store(db: AsyncSession, file: UploadFile, max_size: int) -> models.Blob:
+    # Writes the upload's content unless it is stored already, then adds one
+    # reference to it in the caller's transaction
+    sha256, size = await hash_upload(file, max_size)
+    key = blob_key(sha256)
+    if not await _is_stored(key, size):
+        stored = await uploads.save_upload(file, key, max_size)
+        if stored.sha256 != sha256:
+            # The spooled upload changed between the two passes
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload changed while being stored")
+    await db.execute(_upsert(db.get_bind().dialect.name, sha256, key, size))
+    return models.Blob(sha256=sha256, path=key, size=size)
+
+
+async def adopt(db: AsyncSession, src: str) -> models.Blob:
+    # Same as store() for a complete local file (a finished resumable
+    # upload). The file is copied, not moved: the caller removes it once the
+    # reference is committed, so a failed commit can be retried.
+    sha256, size = await anyio.to_thread.run_sync(hash_file, src)
+    key = blob_key(sha256)
+    if not await _is_stored(key, size):
+        await storage.backend.put_file(key, src)
+    await db.execute(_upsert(db.get_bind().dialect.name, sha256, key, size))
+    return models.Blob(sha256=sha256, path=key, size=size)
+
+
+async def ensure_upload(blob: models.Blob, file: UploadFile, max_size: int):
+    # After the commit: an existing file that store() reused may have been
+    # quarantined by the reconciler before the new reference was visible.
+    # Once committed, the reconciler's own recheck keeps it in place.
+    if await storage.backend.stat(blob.path) is None:
+        await file.seek(0)
+        await uploads.save_upload(file, blob.path, max_size)
+
+
+async def ensure_file(blob: models.Blob, src: str):
+    # Same as ensure_upload() for adopt()
+    if await storage.backend.stat(blob.path) is None:
+        await storage.backend.put_file(blob.path, src)
+
+
+async def release(db: AsyncSession, document: models.Document) -> Optional[str]:
+    # Drops the document's reference. Returns the storage key to delete once
+    # the caller has committed, for a file only this document used.
+    sha256 = document.sha256
+    if sha256 is None or document.file_path != blob_key(sha256):
+        # Stored before content addressing: the file is the document's own
+        return document.file_path
+    ref_count = await db.scalar(
+        update(models.Blob)
+        .where(models.Blob.sha256 == sha256)
+        .values(ref_count=models.Blob.ref_count - 1)
+        .returning(models.Blob.ref_count)
+    )
+    if ref_count is not None and ref_count <= 0:
+        # The file stays until the reconciler finds it unreferenced: deleting
+        # it here could race with an upload of the same content
+        await db.execute(delete(models.Blob).where(models.Blob.sha256 == sha256, models.Blob.ref_count <= 0))
+    return None
+
+
+async def remove(key: Optional[str]):
+    if key is not None:
+        await storage.backend.delete(key)
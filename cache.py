@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class LRUTTLCache:
+    # Bounded LRU map whose entries also expire after `ttl` seconds
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = metrics.counter(f"{name}_cache_hits_total", f"{name} cache hits")
+        self._misses = metrics.counter(f"{name}_cache_misses_total", f"{name} cache misses")
+        metrics.gauge(f"{name}_cache_size", f"Entries in the {name} cache", lambda: len(self._data))
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._data[key]
+        self._misses.inc()
+        return None
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,15 @@
+import sys
+
+from passwords import calibrate_cost
+
+# Usage: python calibrate_bcrypt.py [target_ms]
+# Measures bcrypt on this host and prints the BCRYPT_ROUNDS value to deploy.
+target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250
+
+print(f"Calibrating bcrypt for a target of {target_ms:.0f} ms per hash...")
+cost, timings = calibrate_cost(target_ms / 1000)
+for rounds, seconds in timings.items():
+    marker = "  <-- recommended" if rounds == cost else ""
+    print(f"   cost {rounds:2d}: {seconds * 1000:8.1f} ms{marker}")
+
+print(f"\nSet BCRYPT_ROUNDS={cost}")
@@ -0,0 +1,265 @@
+import mimetypes
+import os
+import uuid
+import zlib
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Only text-like bodies are worth compressing; images, archives and office
+# documents are already compressed and are sent unchanged.
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+}
+
+SIBLING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def available_encodings():
+    # In order of preference
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    # Best supported coding from an Accept-Encoding header, honouring q-values
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+    best, best_q = None, 0.0
+    for coding in available_encodings():
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+class _Encoder:
+    def __init__(self, encoding: str, level: int = None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.brotli_quality if level is None else level)
+        else:
+            # wbits=31: zlib stream with a gzip header and trailer
+            self._compressor = zlib.compressobj(settings.gzip_level if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    # Like Starlette's GZipMiddleware, plus brotli, a content-type allowlist,
+    # and no double encoding of responses that already carry Content-Encoding
+    # (precompressed static files)
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.encoder = None  # set once the response is being compressed
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    @staticmethod
+    def _eligible(status: int, headers: Headers) -> bool:
+        return (
+            status not in (204, 206, 304)
+            and "content-encoding" not in headers
+            and "content-range" not in headers
+            and is_compressible(headers.get("content-type"))
+        )
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk shows the size
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            eligible = self._eligible(start["status"], headers)
+            if eligible:
+                _add_vary(headers)
+            if not eligible or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.encoder = _Encoder(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if not more_body:
+                body = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            # Streaming: the compressed length is not known up front
+            del headers["Content-Length"]
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": self.encoder.compress(body), "more_body": True})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+        chunk = self.encoder.compress(body)
+        if not more_body:
+            chunk += self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+def sibling_path(path: str, encoding: str) -> str:
+    return path + SIBLING_SUFFIXES[encoding]
+
+
+def precompress_file(path: str, encoding: str) -> Optional[str]:
+    # Write (or refresh) the compressed sibling of a static file at maximum
+    # compression. Returns the sibling path, or None when compression is not
+    # worth it for this file.
+    if not is_compressible(mimetypes.guess_type(path)[0]):
+        return None
+    stat_result = os.stat(path)
+    if stat_result.st_size < settings.compression_min_size:
+        return None
+    target = sibling_path(path, encoding)
+    try:
+        if os.stat(target).st_mtime >= stat_result.st_mtime:
+            return target
+    except FileNotFoundError:
+        pass
+    encoder = _Encoder(encoding, level=11 if encoding == "br" else 9)
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(64 * 1024), b""):
+            dst.write(encoder.compress(chunk))
+        dst.write(encoder.finish())
+    # Atomic, so concurrent first requests never serve a partial sibling
+    os.replace(tmp_path, target)
+    return target
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    # Serves `<file>.br` / `<file>.gz` next to a static file when the client
+    # accepts it, creating the sibling on the first request (or ahead of time
+    # with `python precompress.py`), so the same file is never compressed twice.
+    # Files under `immutable_prefixes` have content-hash names and are cached
+    # for a year. With `public_prefixes`, any other file is a 404.
+    def __init__(self, *args, immutable_prefixes=(), public_prefixes=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.public_prefixes = tuple(public_prefixes)
+
+    async def get_response(self, path: str, scope) -> Response:
+        # `path` is already normalized, so ".." cannot lead out of a prefix
+        key = path.replace(os.sep, "/")
+        if self.public_prefixes and not key.startswith(self.public_prefixes):
+            raise HTTPException(status_code=404)
+        response = await self._negotiated_response(path, scope)
+        if response.status_code in (200, 304) and key.startswith(self.immutable_prefixes):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    async def _negotiated_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding", ""))
+        if encoding is None or not is_compressible(response.media_type):
+            return response
+
+        full_path = str(response.path)
+        sibling = await anyio.to_thread.run_sync(precompress_file, full_path, encoding)
+        if sibling is None:
+            return response
+        compressed = FileResponse(
+            sibling,
+            stat_result=await anyio.to_thread.run_sync(os.stat, sibling),
+            media_type=response.media_type,
+            method=scope["method"],
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
+        if self.is_not_modified(compressed.headers, request_headers):
+            return NotModifiedResponse(compressed.headers)
+        return compressed
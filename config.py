@@ -0,0 +1,109 @@
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    # Every field can be overridden with an environment variable of the same
+    # name in upper case (e.g. PASSWORD_POOL_WORKERS=4) or from a local .env file
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database (Render sets DATABASE_URL; SQLite is used when it is missing)
+    database_url: Optional[str] = None
+    # Connection pool, per engine and per worker process. pre_ping and recycle
+    # protect against idle connections dropped by the hosted Postgres.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30  # seconds to wait for a connection before failing
+    db_pool_recycle: int = 1800  # seconds, -1 disables
+    db_pool_pre_ping: bool = True
+
+    # SQLite mode (used when DATABASE_URL is unset). When tuned, the file runs in
+    # WAL mode with the pragmas below, reads use a pool of connections and all
+    # writes are serialized through a single writer connection.
+    sqlite_path: str = "./industrie_v6.db"
+    sqlite_tuned: bool = True
+    sqlite_busy_timeout: int = 5000  # ms to wait on a lock held by another process
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+
+    # Serve the admin dashboard from the materialized stats row. Counters are
+    # only maintained while this is on: run `python stats.py --rebuild` after
+    # enabling it on an existing database.
+    use_stats_table: bool = False
+
+    # Keyset pagination on list endpoints (?limit=, ?cursor=). Lists are only
+    # paged when the client asks for it; page_size_default applies to a
+    # ?cursor= sent without a ?limit=.
+    page_size_default: int = 100
+    page_size_max: int = 500
+
+    # Response compression (gzip, or brotli when the package is installed).
+    # Smaller bodies and already-compressed types (images, archives) are sent as is.
+    compression_min_size: int = 1024  # bytes
+    gzip_level: int = 6
+    brotli_quality: int = 4  # on-the-fly; precompressed static files use the maximum
+
+    # Resumable uploads (/api/uploads). Partial sessions live outside the
+    # public uploads directory and are purged once idle for the TTL.
+    upload_session_dir: str = "./upload_sessions"
+    upload_session_ttl: int = 24 * 3600  # seconds since the last chunk
+    upload_session_sweep_interval: int = 3600  # seconds between purges of expired sessions, 0 = off
+    max_resumable_upload_size: int = 500 * 1024 * 1024
+
+    # File storage for documents and logos. "local" keeps files under
+    # storage_local_root (lost on redeploy on an ephemeral disk); "s3" stores
+    # them in an S3-compatible bucket shared by every instance (needs boto3;
+    # credentials come from the usual AWS_* environment variables).
+    storage_backend: str = "local"  # local | s3
+    storage_local_root: str = "uploads"
+    s3_bucket: str = ""
+    s3_prefix: str = ""
+    s3_endpoint_url: Optional[str] = None  # e.g. MinIO or Cloudflare R2
+    s3_region: Optional[str] = None
+
+    # Document downloads. With an offload mode the app only checks access and
+    # answers with an internal-redirect header; the front proxy sends the file
+    # (and handles ranges). x-accel-redirect (nginx) maps files under uploads/
+    # to download_offload_prefix, which must be an `internal` location;
+    # x-sendfile (Apache/lighttpd) gets the absolute path.
+    download_offload: str = ""  # "" | x-accel-redirect | x-sendfile
+    download_offload_prefix: str = "/protected-uploads/"
+    download_cache_max_age: int = 3600  # seconds; a document id always has the same bytes
+
+    # Orphaned file reconciler (`python reconcile.py`, or in the app every
+    # reconcile_interval seconds). Stored files no row refers to are moved to
+    # quarantine/ once older than the grace period, and deleted after the
+    # retention unless something refers to them again.
+    reconcile_interval: int = 0  # seconds between background batches, 0 = off
+    reconcile_batch_size: int = 1000
+    reconcile_grace: int = 3600  # seconds; younger files may belong to an upload in flight
+    reconcile_retention: int = 7 * 24 * 3600
+
+    # Password hashing process pool
+    password_pool_workers: int = 0  # 0 = one worker per CPU core
+    password_pool_max_queue: int = 32  # requests allowed to wait once all workers are busy
+    # bcrypt work factor for new hashes; run `python calibrate_bcrypt.py` on the
+    # target host to pick one. Hashes at another cost are upgraded on login.
+    bcrypt_rounds: int = 12
+
+    # Authenticated principal cache (see auth.get_current_user). Each worker
+    # checks every principal_cache_refresh_interval seconds whether any user
+    # changed and drops its cache if so, which bounds how stale another
+    # worker's copy can be after an admin change.
+    principal_cache_size: int = 10000
+    principal_cache_ttl: int = 60  # seconds
+    principal_cache_refresh_interval: float = 2  # seconds, 0 = off (single worker only)
+
+    # Auth throttling: attempts allowed per key within `rate_limit_window` seconds.
+    # Use the sqlite backend to share buckets between workers on one host.
+    rate_limit_backend: str = "memory"  # memory | sqlite
+    rate_limit_sqlite_path: str = "./rate_limits.db"
+    rate_limit_window: int = 60
+    login_ip_limit: int = 20
+    login_email_limit: int = 5
+    register_ip_limit: int = 5
+    trust_forwarded_for: bool = False  # set behind a proxy such as Render's
+
+
+settings = Settings()
@@ -0,0 +1,79 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# Run the suite from a scratch directory so the SQLite file, uploads and the
+# scripts' log files never touch the working tree. Must happen before the
+# app modules are imported, since they resolve these paths at import time.
+os.chdir(tempfile.mkdtemp(prefix="industrie-tests-"))
+
+import models  # noqa: E402
+from auth import create_access_token  # noqa: E402
+from database import SessionLocal  # noqa: E402
+
+_fixture_ids = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    from database import engine
+    import migrations
+
+    migrations.upgrade(engine)
+    return engine
+
+
+@pytest.fixture
+def client(migrated_db):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def auth_headers(user_id) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+class Seeder:
+    # Rows for one test, committed as they are created. Names and emails
+    # carry a number unique to the test session, since the database is
+    # shared by every test.
+    def __init__(self, db):
+        self.db = db
+
+    def unique(self) -> int:
+        return next(_fixture_ids)
+
+    def team(self, name: str = "Team", **fields) -> models.Team:
+        team = models.Team(name=f"{name} {self.unique()}", **fields)
+        self.db.add(team)
+        self.db.commit()
+        return team
+
+    def user(self, team=None, role=models.UserRole.STUDENT, full_name: str = "Student", **fields) -> models.User:
+        user = models.User(
+            email=f"user{self.unique()}@example.com", password_hash="x", full_name=full_name, role=role,
+            team_id=team.id if team is not None else None, **fields
+        )
+        self.db.add(user)
+        self.db.commit()
+        return user
+
+    def admin(self) -> models.User:
+        return self.user(role=models.UserRole.ADMIN, full_name="Admin")
+
+    def headers(self, user: models.User) -> dict:
+        return auth_headers(user.id)
+
+
+@pytest.fixture
+def seed(migrated_db):
+    db = SessionLocal()
+    try:
+        yield Seeder(db)
+    finally:
+        db.close()
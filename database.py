@@ -1,31 +1,151 @@
-import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-# Get DATABASE_URL from environment variable (Render sets this automatically)
-DATABASE_URL = os.getenv("DATABASE_URL")
+from config import settings
+import metrics
+
+POOL_WAIT_SECONDS = metrics.histogram(
+    "db_pool_wait_seconds", "Time to obtain a pooled connection (checkout, pre-ping and connect)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+)
+POOL_TIMEOUTS = metrics.counter("db_pool_timeouts_total", "Checkouts that gave up after db_pool_timeout")
+
+class InstrumentedPoolMixin:
+    # Times every checkout so pool sizing can be based on real waits
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _pool_options():
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+def _async_postgres_url(url: str):
+    # Same database through asyncpg, which spells libpq's sslmode as ssl
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in async_url.query:
+        query = dict(async_url.query)
+        query["ssl"] = query.pop("sslmode")
+        async_url = async_url.set(query=query)
+    return async_url
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # readers no longer block behind the writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # durable in WAL mode, far fewer fsyncs
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute(f"PRAGMA cache_size={-settings.sqlite_cache_size_kb}")
+    cursor.close()
+
+def create_sqlite_engines(path: str, tuned: bool = True):
+    # Returns (sync engine, async reader engine, async writer engine or None)
+    sync_url = f"sqlite:///{path}"
+    async_url = f"sqlite+aiosqlite:///{path}"
+    sync_engine = create_engine(sync_url, connect_args={"check_same_thread": False})
+    if not tuned:
+        return sync_engine, create_async_engine(async_url), None
+
+    reader_engine = create_async_engine(
+        async_url, poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout
+    )
+    # A single connection: concurrent writers queue on the pool instead of
+    # failing with "database is locked"
+    writer_engine = create_async_engine(
+        async_url, poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=settings.db_pool_timeout
+    )
+    for e in (sync_engine, reader_engine.sync_engine, writer_engine.sync_engine):
+        event.listen(e, "connect", _set_sqlite_pragmas)
+    return sync_engine, reader_engine, writer_engine
+
+def make_async_sessionmaker(reader_engine, writer_engine=None):
+    if writer_engine is None:
+        return async_sessionmaker(
+            reader_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+
+    class RoutingSession(Session):
+        # Flushes and DML statements go to the writer, everything else to the readers
+        def get_bind(self, mapper=None, clause=None, **kw):
+            if self._flushing or isinstance(clause, UpdateBase):
+                return writer_engine.sync_engine
+            return reader_engine.sync_engine
+
+    return async_sessionmaker(
+        class_=AsyncSession, sync_session_class=RoutingSession,
+        autoflush=False, expire_on_commit=False
+    )
+
+DATABASE_URL = settings.database_url
+writer_engine = None
 
 if DATABASE_URL:
     print("🚀 LOADING: Utilisation de la base de données POSTGRESQL (Render)")
     # Render uses postgres:// but SQLAlchemy requires postgresql://
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    
+
     # Create engine for PostgreSQL
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **_pool_options())
+    async_engine = create_async_engine(
+        _async_postgres_url(DATABASE_URL), poolclass=InstrumentedAsyncQueuePool, **_pool_options()
+    )
 else:
     print("⚠️ LOADING: Utilisation de la base de données SQLITE (Local)")
-    # Fallback: Use SQLite for local development
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./industrie_v6.db"
-    
-    # Create engine for SQLite
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
+    # Fallback: Use SQLite for local development or small deployments
+    engine, async_engine, writer_engine = create_sqlite_engines(settings.sqlite_path, settings.sqlite_tuned)
 
+# Sync sessions are kept for scripts and maintenance tasks
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers use async sessions. Objects stay usable after commit because
+# lazy refreshes are not possible outside the async context.
+AsyncSessionLocal = make_async_sessionmaker(async_engine, writer_engine)
+
+def pool_stats(pool=None) -> dict:
+    pool = pool or async_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+metrics.gauge("db_pool_size", "Configured pool size", lambda: pool_stats().get("size", 0))
+metrics.gauge("db_pool_checked_out", "Connections currently in use", lambda: pool_stats().get("checked_out", 0))
+metrics.gauge("db_pool_checked_in", "Idle connections in the pool", lambda: pool_stats().get("checked_in", 0))
+# QueuePool reports overflow as negative while the pool is still filling up
+metrics.gauge("db_pool_overflow", "Connections opened beyond pool_size", lambda: max(0, pool_stats().get("overflow", 0)))
+
 Base = declarative_base()
 
 def get_db():
@@ -34,3 +154,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,175 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, status
+from starlette.responses import Response, StreamingResponse
+
+from compression import IMMUTABLE_CACHE_CONTROL
+from config import settings
+from etags import etag_matches
+import storage
+
+# Responses for stored files (any storage backend): strong ETag and
+# Last-Modified validators, If-None-Match / If-Modified-Since -> 304, single
+# byte ranges (Range, If-Range -> 206/416), Cache-Control, and optionally
+# handing the transfer itself to the front proxy (see settings.download_offload).
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    # (start, end) inclusive for a single satisfiable range, None to ignore
+    # the header (multiple ranges are answered with the whole file), or
+    # ValueError when the range cannot be satisfied
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if first and last and int(first) > int(last):
+        # Syntactically invalid (RFC 7233 2.1): ignore the header, not 416
+        return None
+    if size == 0:
+        # An empty file has no byte to satisfy any range with
+        raise ValueError("range not satisfiable")
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_allows(request: Request, etag: str, last_modified: str) -> bool:
+    # A range is only served if the client's copy is the current one; If-Range
+    # needs the strong comparison
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag and not etag.startswith("W/")
+    return if_range == last_modified
+
+
+def _offload_headers(key: str) -> Optional[dict]:
+    if settings.download_offload == "x-sendfile":
+        path = storage.backend.local_path(key)
+        return {"X-Sendfile": os.path.abspath(path)} if path else None
+    if settings.download_offload == "x-accel-redirect":
+        return {"X-Accel-Redirect": settings.download_offload_prefix.rstrip("/") + "/" + quote(key)}
+    return None
+
+
+async def send_file(
+    request: Request,
+    key: str,
+    filename: str,
+    etag: Optional[str] = None,
+    inline: bool = False,
+    cache_control: Optional[str] = None,
+) -> Response:
+    stat = await storage.backend.stat(key)
+    if stat is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found on server"
+        )
+    if etag is None:
+        # No content hash (older uploads): size and modification time
+        etag = f'"{int(stat.mtime * 1e9):x}-{stat.size:x}"'
+    last_modified = formatdate(stat.mtime, usegmt=True)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": cache_control or f"private, max-age={settings.download_cache_max_age}",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition(filename, "inline" if inline else "attachment"),
+    }
+
+    if _not_modified(request, etag, stat.mtime):
+        del headers["Content-Disposition"]
+        return Response(status_code=304, headers=headers)
+
+    offload = _offload_headers(key)
+    if offload:
+        # The proxy strips this header and sends the file itself
+        return Response(media_type=media_type, headers={**headers, **offload})
+
+    start, end = 0, stat.size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if range_header and _if_range_allows(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, stat.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD" or stat.size == 0:
+        return Response(status_code=status_code, media_type=media_type, headers=headers)
+    return StreamingResponse(
+        storage.backend.stream(key, start, end), status_code=status_code, media_type=media_type, headers=headers
+    )
+
+
+class StorageFiles:
+    # Public read-only mount over the storage backend, used for /uploads when
+    # files are not on the local disk. Keys under `immutable_prefixes` have
+    # content-hash names and are cached for a year. With `public_prefixes`,
+    # any other key is a 404.
+    def __init__(self, cache_control: str = "public, max-age=300", immutable_prefixes=(), public_prefixes=()):
+        self.cache_control = cache_control
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.public_prefixes = tuple(public_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        key = scope["path"].lstrip("/")
+        if request.method not in ("GET", "HEAD"):
+            response = Response(status_code=405)
+        elif not key or any(part in ("", ".", "..") for part in key.split("/")):
+            response = Response(status_code=404)
+        elif self.public_prefixes and not key.startswith(self.public_prefixes):
+            response = Response(status_code=404)
+        else:
+            try:
+                cache_control = IMMUTABLE_CACHE_CONTROL if key.startswith(self.immutable_prefixes) else self.cache_control
+                response = await send_file(request, key, key.rsplit("/", 1)[-1], inline=True, cache_control=cache_control)
+            except HTTPException as exc:
+                response = Response(status_code=exc.status_code)
+        await response(scope, receive, send)
@@ -0,0 +1,82 @@
+import hashlib
+import io
+from typing import Dict, Optional
+
+import anyio
+from sqlalchemy import update
+
+import models
+import storage
+from database import AsyncSessionLocal
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: without Pillow teams only have the original logo
+    Image = None
+
+# Team logo variants. After an upload, a background task renders small,
+# medium and large WebP and PNG versions of the logo (first frame of animated
+# images), stores them under content-hash names in logos/v/, and records
+# their URLs in Team.logo_variants. Because a name only ever holds the same
+# bytes, /uploads serves them with an immutable one-year Cache-Control.
+PREFIX = "logos/"  # every team logo, the only files /uploads serves
+VARIANT_PREFIX = PREFIX + "v/"
+SIZES = {"small": 64, "medium": 160, "large": 320}  # longest edge, px
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 82, "method": 6},
+    "png": {"format": "PNG", "optimize": True},
+}
+
+
+def render_variants(data: bytes) -> Dict[str, Dict[str, bytes]]:
+    # {size: {format: encoded image}}. CPU-bound, runs in a worker thread.
+    with Image.open(io.BytesIO(data)) as image:
+        image.seek(0)
+        image = ImageOps.exif_transpose(image).convert("RGBA")
+    variants = {}
+    for name, edge in SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        variants[name] = {}
+        for extension, options in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, **options)
+            variants[name][extension] = buffer.getvalue()
+    return variants
+
+
+def variant_key(content: bytes, name: str, extension: str) -> str:
+    return f"{VARIANT_PREFIX}{hashlib.sha256(content).hexdigest()[:24]}-{name}.{extension}"
+
+
+async def build_variants(original_key: str) -> Dict[str, Dict[str, str]]:
+    # {size: {format: URL}}
+    rendered = await anyio.to_thread.run_sync(render_variants, await storage.backend.get(original_key))
+    urls = {}
+    for name, encoded in rendered.items():
+        urls[name] = {}
+        for extension, content in encoded.items():
+            key = variant_key(content, name, extension)
+            # Same name, same bytes: an existing variant is already right
+            if await storage.backend.stat(key) is None:
+                await storage.backend.put(key, content)
+            urls[name][extension] = f"/uploads/{key}"
+    return urls
+
+
+async def process_logo(team_id: int, original_key: str):
+    # Background task scheduled by the logo upload
+    if Image is None:
+        return
+    try:
+        variants: Optional[dict] = await build_variants(original_key)
+    except (OSError, Image.DecompressionBombError):
+        return  # not an image Pillow can read: keep serving the original only
+    async with AsyncSessionLocal() as db:
+        # Unless another logo was uploaded meanwhile
+        await db.execute(
+            update(models.Team)
+            .where(models.Team.id == team_id, models.Team.logo_url == f"/uploads/{original_key}")
+            .values(logo_variants=variants)
+        )
+        await db.commit()
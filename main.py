@@ -1,20 +1,60 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 # Trigger reload v6
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
-from database import engine, Base
-from routes import auth, teams, documents, admin
+from config import settings
+from database import async_engine, writer_engine
+from routes import auth, teams, documents, admin, resumable
+import metrics
+from compression import CompressionMiddleware, PrecompressedStaticFiles
+from downloads import StorageFiles
+import storage
+import logos
+import migrations
+import passwords
+import reconcile
+from auth import get_current_admin, watch_principals
+import upload_sessions
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are applied by `python migrate.py`; workers only verify the version
+    async with async_engine.connect() as conn:
+        await conn.run_sync(migrations.check_version)
+    # Start the bcrypt worker processes before the first login arrives
+    passwords.pool.start()
+    # Orphaned file cleanup in small batches (or run `python reconcile.py` from cron)
+    reconciler = asyncio.create_task(reconcile.run_forever(settings.reconcile_interval)) if settings.reconcile_interval else None
+    # Part files of abandoned resumable uploads
+    sweeper = (
+        asyncio.create_task(upload_sessions.run_forever(settings.upload_session_sweep_interval))
+        if settings.upload_session_sweep_interval else None
+    )
+    # Other workers' admin changes reach this worker's principal cache
+    principal_watcher = (
+        asyncio.create_task(watch_principals(settings.principal_cache_refresh_interval))
+        if settings.principal_cache_refresh_interval else None
+    )
+    yield
+    for task in (reconciler, sweeper, principal_watcher):
+        if task is not None:
+            task.cancel()
+    passwords.pool.shutdown()
+    await async_engine.dispose()
+    if writer_engine is not None:
+        await writer_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title="Industrie 4.0 - Team Management",
     description="Application de gestion d'équipes pour projets Industrie 4.0",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
@@ -24,18 +64,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors and resumable upload offsets travel in response headers
+    expose_headers=["X-Next-Cursor", "Link", "Upload-Offset"],
 )
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(teams.router)
 app.include_router(documents.router)
 app.include_router(admin.router)
+app.include_router(resumable.router)
 
-# Mount uploads directory
-# Mount uploads directory
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Mount uploads directory. Only team logos are public: documents (blobs/,
+# quarantine/, older uploads) are only sent by the permission-checked
+# download route.
+public_files = {"immutable_prefixes": [logos.VARIANT_PREFIX], "public_prefixes": [logos.PREFIX]}
+if isinstance(storage.backend, storage.LocalStorage):
+    os.makedirs(storage.backend.root, exist_ok=True)
+    app.mount("/uploads", PrecompressedStaticFiles(directory=storage.backend.root, **public_files), name="uploads")
+else:
+    # Served from the shared bucket, so every instance sees every logo
+    app.mount("/uploads", StorageFiles(**public_files), name="uploads")
 
 @app.get("/")
 def root():
@@ -48,3 +98,8 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+# Pool, cache and password-queue telemetry is for operators only
+@app.get("/metrics", dependencies=[Depends(get_current_admin)])
+def get_metrics():
+    return metrics.snapshot()
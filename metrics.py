@@ -0,0 +1,122 @@
+import threading
+from bisect import bisect_left
+
+# Minimal in-process metrics registry, exposed as JSON on the admin-only /metrics
+_registry = {}
+_lock = threading.Lock()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: dict) -> str:
+    return ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self):
+        if list(self._values) in ([], [""]):
+            return self._values.get("", 0)
+        return dict(self._values)
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name: str, description: str = "", callback=None):
+        self.name = name
+        self.description = description
+        self._value = 0
+        # Callback gauges are computed when the metrics are read
+        self._callback = callback
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        self._value += amount
+
+    def dec(self, amount: float = 1):
+        self._value -= amount
+
+    def value(self) -> float:
+        return self._callback() if self._callback else self._value
+
+    def snapshot(self):
+        return self.value()
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, description: str = "", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self._counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self._count, "sum": self._sum, "buckets": buckets}
+
+
+def _get_or_create(cls, name, *args, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name: str, description: str = "") -> Counter:
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name: str, description: str = "", callback=None) -> Gauge:
+    return _get_or_create(Gauge, name, description, callback)
+
+
+def histogram(name: str, description: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, description, buckets)
+
+
+def snapshot() -> dict:
+    with _lock:
+        metrics = list(_registry.values())
+    return {
+        m.name: {"type": m.type, "description": m.description, "value": m.snapshot()}
+        for m in metrics
+    }
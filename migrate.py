@@ -0,0 +1,20 @@
+import sys
+
+from database import engine
+import migrations
+
+# Usage: python migrate.py [--status]
+# Applies pending schema migrations. Run once per deploy, before starting the
+# app workers.
+if __name__ == "__main__":
+    with engine.connect() as conn:
+        version = migrations.current_version(conn)
+    print(f"Schema version: {version} (latest: {migrations.LATEST_VERSION})")
+
+    if "--status" in sys.argv:
+        sys.exit(0 if version == migrations.LATEST_VERSION else 1)
+
+    applied = migrations.upgrade(engine)
+    for name in applied:
+        print(f"   applied {name}")
+    print("Database is up to date" if applied else "Nothing to apply")
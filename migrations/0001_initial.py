@@ -0,0 +1,47 @@
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table
+)
+
+# Baseline schema, frozen as it was created by Base.metadata.create_all.
+# checkfirst makes it a no-op on databases that already have these tables.
+metadata = MetaData()
+
+teams = Table(
+    "teams", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, nullable=False),
+    Column("theme", String, nullable=True),
+    Column("sub_theme", String, nullable=True),
+    Column("sub_theme_status", Enum("PENDING", "APPROVED", "REJECTED", name="validationstatus"), nullable=True),
+    Column("logo_url", String, nullable=True),
+    Column("created_at", DateTime),
+    Column("status", Enum("ACTIVE", "COMPLETED", name="teamstatus")),
+)
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("password_hash", String, nullable=False),
+    Column("full_name", String, nullable=False),
+    Column("role", Enum("STUDENT", "ADMIN", name="userrole")),
+    Column("team_id", Integer, ForeignKey("teams.id"), nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+)
+
+documents = Table(
+    "documents", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("team_id", Integer, ForeignKey("teams.id"), nullable=False),
+    Column("filename", String, nullable=False),
+    Column("file_path", String, nullable=False),
+    Column("uploaded_by", Integer, ForeignKey("users.id"), nullable=False),
+    Column("uploaded_at", DateTime),
+    Column("status", Enum("PENDING", "APPROVED", "REJECTED", name="documentstatus")),
+    Column("admin_comment", String, nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,23 @@
+from sqlalchemy import Index, MetaData, Table
+
+# Composite indexes for the filters used by the admin, dashboard and team
+# listing endpoints. Column order puts the equality filter first and the
+# listing order last, so the same index serves filtering and sorting.
+INDEXES = {
+    "users": [
+        ("ix_users_team_id", ["team_id"]),
+        ("ix_users_role_is_active_created_at", ["role", "is_active", "created_at", "id"]),
+    ],
+    "documents": [
+        ("ix_documents_status_uploaded_at", ["status", "uploaded_at", "id"]),
+        ("ix_documents_team_id_uploaded_at", ["team_id", "uploaded_at", "id"]),
+    ],
+}
+
+
+def upgrade(conn):
+    metadata = MetaData()
+    for table_name, indexes in INDEXES.items():
+        table = Table(table_name, metadata, autoload_with=conn)
+        for name, columns in indexes:
+            Index(name, *[table.c[c] for c in columns]).create(conn, checkfirst=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, MetaData, Table, text
+
+metadata = MetaData()
+
+stats = Table(
+    "stats", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("total_users", Integer, nullable=False, default=0),
+    Column("total_teams", Integer, nullable=False, default=0),
+    Column("pending_documents", Integer, nullable=False, default=0),
+    Column("approved_documents", Integer, nullable=False, default=0),
+    Column("rejected_documents", Integer, nullable=False, default=0),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    # Seed the single counters row from the current data
+    conn.execute(text(
+        "INSERT INTO stats (id, total_users, total_teams, pending_documents, approved_documents, rejected_documents) "
+        "SELECT 1, "
+        "(SELECT COUNT(*) FROM users WHERE role = 'STUDENT'), "
+        "(SELECT COUNT(*) FROM teams), "
+        "(SELECT COUNT(*) FROM documents WHERE status = 'PENDING'), "
+        "(SELECT COUNT(*) FROM documents WHERE status = 'APPROVED'), "
+        "(SELECT COUNT(*) FROM documents WHERE status = 'REJECTED')"
+    ))
@@ -0,0 +1,38 @@
+from sqlalchemy import DateTime, Index, MetaData, Table, inspect, text
+
+# updated_at on the polled tables, so conditional GETs can build their ETags
+# from (row count, latest update) aggregates instead of the response body.
+# Existing rows start out at their creation time.
+COLUMNS = {
+    "users": "created_at",
+    "teams": "created_at",
+    "documents": "uploaded_at",
+}
+
+INDEXES = {
+    "users": [("ix_users_team_id_updated_at", ["team_id", "updated_at"])],
+    "documents": [("ix_documents_team_id_updated_at", ["team_id", "updated_at"])],
+}
+
+# Superseded by ix_users_team_id_updated_at, which has the same prefix
+DROPPED_INDEXES = {"users": ["ix_users_team_id"]}
+
+
+def upgrade(conn):
+    column_type = DateTime().compile(dialect=conn.dialect)
+    for table_name, created_column in COLUMNS.items():
+        existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+        if "updated_at" not in existing:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN updated_at {column_type}"))
+        conn.execute(text(f"UPDATE {table_name} SET updated_at = {created_column} WHERE updated_at IS NULL"))
+
+    metadata = MetaData()
+    for table_name, names in DROPPED_INDEXES.items():
+        table = Table(table_name, metadata, autoload_with=conn)
+        for index in table.indexes:
+            if index.name in names:
+                index.drop(conn)
+    for table_name, indexes in INDEXES.items():
+        table = Table(table_name, metadata, autoload_with=conn, extend_existing=True)
+        for name, columns in indexes:
+            Index(name, *[table.c[c] for c in columns]).create(conn, checkfirst=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, String, inspect, text
+
+# Size and SHA-256 of each stored document, computed while the upload streams
+# to disk. Rows uploaded before this migration keep NULLs.
+COLUMNS = {
+    "size": BigInteger(),
+    "sha256": String(64),
+}
+
+
+def upgrade(conn):
+    existing = {c["name"] for c in inspect(conn).get_columns("documents")}
+    for name, column_type in COLUMNS.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE documents ADD COLUMN {name} {column_type.compile(dialect=conn.dialect)}"))
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+# Content-addressed document storage. Documents uploaded before this version
+# keep their own files and have no blob row.
+blobs = Table(
+    "blobs", metadata,
+    Column("sha256", String(64), primary_key=True),
+    Column("path", String, nullable=False),
+    Column("size", BigInteger, nullable=False),
+    Column("ref_count", Integer, nullable=False, default=0),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+
+# Document and blob locations become storage keys relative to the storage
+# root ("blobs/ab/<sha256>") instead of paths under the local uploads
+# directory ("uploads/blobs/ab/<sha256>"), so they also name S3 objects.
+# Paths written on Windows ("uploads\blobs\ab\...") get forward slashes first.
+PREFIX = "uploads/"
+WINDOWS_PREFIX = "uploads\\"
+
+
+def upgrade(conn):
+    for table, column in (("documents", "file_path"), ("blobs", "path")):
+        # Compared with substr rather than LIKE, where a backslash is an escape on some databases
+        conn.execute(
+            text(f"UPDATE {table} SET {column} = replace({column}, :backslash, '/') "
+                 f"WHERE substr({column}, 1, :length) = :windows_prefix"),
+            {"backslash": "\\", "length": len(WINDOWS_PREFIX), "windows_prefix": WINDOWS_PREFIX},
+        )
+        conn.execute(
+            text(f"UPDATE {table} SET {column} = substr({column}, :start) WHERE {column} LIKE :pattern"),
+            {"start": len(PREFIX) + 1, "pattern": PREFIX + "%"},
+        )
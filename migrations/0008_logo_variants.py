@@ -0,0 +1,10 @@
+from sqlalchemy import JSON, inspect, text
+
+# Resized, content-hash named logo variants (see logos.py). Teams keep NULL
+# until their next logo upload.
+
+
+def upgrade(conn):
+    existing = {c["name"] for c in inspect(conn).get_columns("teams")}
+    if "logo_variants" not in existing:
+        conn.execute(text(f"ALTER TABLE teams ADD COLUMN logo_variants {JSON().compile(dialect=conn.dialect)}"))
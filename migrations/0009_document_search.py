@@ -0,0 +1,30 @@
+from sqlalchemy import inspect, text
+
+# Full-text index over document names and extracted text (see search.py).
+# Existing documents are indexed by name; run `python search.py` to extract
+# their text.
+SQLITE = [
+    "CREATE VIRTUAL TABLE document_search USING fts5(filename, content, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO document_search (rowid, filename, content) SELECT id, filename, '' FROM documents",
+]
+
+# The configuration must match search.SEARCH_CONFIG
+POSTGRES = [
+    """CREATE TABLE document_search (
+        document_id INTEGER PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+        filename TEXT NOT NULL DEFAULT '',
+        content TEXT NOT NULL DEFAULT '',
+        vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('french', filename), 'A') || setweight(to_tsvector('french', content), 'B')
+        ) STORED
+    )""",
+    "CREATE INDEX ix_document_search_vector ON document_search USING GIN (vector)",
+    "INSERT INTO document_search (document_id, filename, content) SELECT id, filename, '' FROM documents",
+]
+
+
+def upgrade(conn):
+    if inspect(conn).has_table("document_search"):
+        return
+    for statement in SQLITE if conn.dialect.name == "sqlite" else POSTGRES:
+        conn.execute(text(statement))
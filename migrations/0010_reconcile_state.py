@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, MetaData, String, Table, insert, select
+
+metadata = MetaData()
+
+# Progress of the orphaned file reconciler (see reconcile.py), and an index
+# for its "is this storage key still used" lookups
+reconcile_state = Table(
+    "reconcile_state", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("cursor", String, nullable=True),
+    Column("pass_started_at", DateTime, nullable=True),
+    Column("reclaimed_bytes", BigInteger, nullable=False, default=0),
+    Column("updated_at", DateTime, nullable=True),
+    # Held by the process running a batch, so concurrent workers and cron runs take turns
+    Column("lease_owner", String, nullable=True),
+    Column("lease_expires_at", DateTime, nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    # The single state row, so the lease is always taken with an UPDATE
+    if conn.execute(select(reconcile_state.c.id)).first() is None:
+        conn.execute(insert(reconcile_state).values(id=1, reclaimed_bytes=0))
+    documents = Table("documents", MetaData(), autoload_with=conn)
+    Index("ix_documents_file_path", documents.c.file_path).create(conn, checkfirst=True)
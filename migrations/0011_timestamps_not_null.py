@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, bindparam, text
+
+# Keyset pagination orders by these timestamps and puts them in its cursors,
+# where a NULL would either break the cursor or drop the row from every page.
+# Rows that have none get their last update time (or now), then NULLs are
+# refused: with NOT NULL on Postgres, and with triggers on SQLite, which
+# cannot add the constraint to an existing column.
+COLUMNS = {
+    "users": "created_at",
+    "teams": "created_at",
+    "documents": "uploaded_at",
+}
+
+
+def upgrade(conn):
+    now = bindparam("now", datetime.utcnow(), type_=DateTime())
+    for table_name, column in COLUMNS.items():
+        conn.execute(
+            text(f"UPDATE {table_name} SET {column} = COALESCE(updated_at, :now) WHERE {column} IS NULL").bindparams(now)
+        )
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {column} SET NOT NULL"))
+            continue
+        for event in ("INSERT", f"UPDATE OF {column}"):
+            name = f"{table_name}_{column}_not_null_{event.split()[0].lower()}"
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {name} BEFORE {event} ON {table_name} "
+                f"WHEN NEW.{column} IS NULL "
+                f"BEGIN SELECT RAISE(ABORT, 'NOT NULL constraint failed: {table_name}.{column}'); END"
+            ))
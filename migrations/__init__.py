@@ -0,0 +1,69 @@
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+# Versioned schema migrations. Each module is named NNNN_description.py and
+# defines upgrade(conn), which receives a SQLAlchemy Connection inside the
+# migration transaction. Run them once per deploy with `python migrate.py`;
+# the app itself only checks that the recorded version is current.
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def load_migrations():
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        prefix = module_info.name.split("_", 1)[0]
+        if prefix.isdigit():
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append((int(prefix), module_info.name, module))
+    return sorted(migrations, key=lambda m: m[0])
+
+
+MIGRATIONS = load_migrations()
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn) -> int:
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    versions = conn.execute(select(schema_version.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def upgrade(engine, target: int = LATEST_VERSION):
+    # Each migration runs and is recorded in its own transaction
+    applied = []
+    with engine.begin() as conn:
+        version_metadata.create_all(conn, checkfirst=True)
+        version = current_version(conn)
+
+    for number, name, module in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=number, name=name, applied_at=datetime.utcnow()
+            ))
+        applied.append(name)
+    return applied
+
+
+def check_version(conn):
+    # Cheap startup check: one query, no reflection of the application tables
+    version = current_version(conn)
+    if version != LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, the code expects {LATEST_VERSION}. "
+            "Run `python migrate.py` before starting the app."
+        )
+    return version
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Enum, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -32,10 +32,19 @@ class User(Base):
     role = Column(Enum(UserRole), default=UserRole.STUDENT)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=True)
     is_active = Column(Boolean, default=True)  # Defaults to True to support old users, logic handles False for new
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     team = relationship("Team", back_populates="members")
     uploaded_documents = relationship("Document", back_populates="uploader")
+    
+    # Hot filters: member counts and versions per team, student lists and pending approvals
+    __table_args__ = (
+        Index("ix_users_team_id_updated_at", "team_id", "updated_at"),
+        Index("ix_users_role_is_active_created_at", "role", "is_active", "created_at", "id"),
+    )
+
+DEFAULT_LOGO_URL = "/uploads/logos/team_1_smile.gif"
 
 class Team(Base):
     __tablename__ = "teams"
@@ -46,8 +55,10 @@ class Team(Base):
     sub_theme = Column(String, nullable=True)  # Defined by students
     sub_theme_status = Column(Enum(ValidationStatus), nullable=True)
     logo_url = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    logo_variants = Column(JSON, nullable=True)  # {size: {format: url}}, see logos.py
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     status = Column(Enum(TeamStatus), default=TeamStatus.ACTIVE)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     members = relationship("User", back_populates="team")
     documents = relationship("Document", back_populates="team")
@@ -58,11 +69,58 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
     filename = Column(String, nullable=False)
-    file_path = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)  # storage key (see storage.py)
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     status = Column(Enum(DocumentStatus), default=DocumentStatus.PENDING)
     admin_comment = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=True)  # bytes
+    sha256 = Column(String(64), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     team = relationship("Team", back_populates="documents")
     uploader = relationship("User", back_populates="uploaded_documents")
+    
+    # Hot filters: admin pending list / dashboard counts, team listings and versions
+    __table_args__ = (
+        Index("ix_documents_status_uploaded_at", "status", "uploaded_at", "id"),
+        Index("ix_documents_team_id_uploaded_at", "team_id", "uploaded_at", "id"),
+        Index("ix_documents_team_id_updated_at", "team_id", "updated_at"),
+        Index("ix_documents_file_path", "file_path"),
+    )
+
+class Blob(Base):
+    # Content-addressed file shared by every document with the same bytes
+    # (see blobs.py); the row goes when ref_count drops to zero, the file with
+    # the next reconciler pass
+    __tablename__ = "blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)  # storage key
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Stats(Base):
+    # Single-row materialized dashboard counters (id is always 1), maintained
+    # in the same transaction as the writes when USE_STATS_TABLE is enabled
+    __tablename__ = "stats"
+    
+    id = Column(Integer, primary_key=True)
+    total_users = Column(Integer, nullable=False, default=0)
+    total_teams = Column(Integer, nullable=False, default=0)
+    pending_documents = Column(Integer, nullable=False, default=0)
+    approved_documents = Column(Integer, nullable=False, default=0)
+    rejected_documents = Column(Integer, nullable=False, default=0)
+
+class ReconcileState(Base):
+    # Single-row progress of the orphaned file reconciler (id is always 1)
+    __tablename__ = "reconcile_state"
+    
+    id = Column(Integer, primary_key=True)
+    cursor = Column(String, nullable=True)  # last storage key examined; NULL starts a new pass
+    pass_started_at = Column(DateTime, nullable=True)
+    reclaimed_bytes = Column(BigInteger, nullable=False, default=0)  # total since the first run
+    lease_owner = Column(String, nullable=True)  # process running a batch
+    lease_expires_at = Column(DateTime, nullable=True)  # a crashed owner's lease lapses here
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,67 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response, status
+from sqlalchemy import literal, tuple_
+
+from config import settings
+
+# Keyset pagination on (timestamp, id). Listings keep returning a plain JSON
+# array; the opaque cursor for the next page is sent in the X-Next-Cursor
+# header (and as a Link rel="next" URL) and passed back as ?cursor=.
+# Requests without ?limit= or ?cursor= get the whole list, as before
+# pagination existed; a cursor without a limit pages by page_size_default.
+
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=settings.page_size_max),
+    ):
+        self.cursor = cursor
+        if limit is None and cursor:
+            limit = settings.page_size_default
+        self.limit = limit
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset(query, timestamp_column, id_column, page: PageParams):
+    if page.cursor:
+        timestamp, row_id = decode_cursor(page.cursor)
+        # Typed binds so the timestamp is compared in the column's storage format
+        after = tuple_(literal(timestamp, timestamp_column.type), literal(row_id, id_column.type))
+        query = query.where(tuple_(timestamp_column, id_column) > after)
+    query = query.order_by(timestamp_column, id_column)
+    if page.limit is None:
+        return query
+    # One extra row tells whether there is a next page
+    return query.limit(page.limit + 1)
+
+
+def finish(items: list, page: PageParams, request: Request, response: Response, key) -> list:
+    # key(item) -> (timestamp, id) of a returned item
+    if page.limit is None or len(items) <= page.limit:
+        return items
+    items = items[:page.limit]
+    next_cursor = encode_cursor(*key(items[-1]))
+    response.headers["X-Next-Cursor"] = next_cursor
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return items
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from config import settings
+import metrics
+
+# bcrypt is pure CPU work (~250 ms per call at the default cost). Running it on
+# AnyIO's shared threadpool starves every other sync endpoint during a login
+# rush, so the async endpoints send it to a dedicated, bounded process pool.
+
+HASH_SECONDS = metrics.histogram("password_hash_seconds", "Time to hash a password, queue wait included")
+VERIFY_SECONDS = metrics.histogram("password_verify_seconds", "Time to verify a password, queue wait included")
+REJECTED = metrics.counter("password_pool_rejected_total", "Password operations refused because the pool was saturated")
+RESTARTS = metrics.counter("password_pool_restarts_total", "Password pools replaced after a worker process died")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        # bcrypt requires bytes
+        return bcrypt.checkpw(
+            plain_password.encode('utf-8')[:72],
+            hashed_password.encode('utf-8')
+        )
+    except Exception:
+        return False
+
+
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    # Bcrypt has a 72 byte limit
+    password_bytes = password.encode('utf-8')[:72]
+    salt = bcrypt.gensalt(rounds=rounds or settings.bcrypt_rounds)
+    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    # Modular crypt format: $2b$<cost>$<salt+checksum>
+    parts = hashed_password.split("$")
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_cost(hashed_password) != settings.bcrypt_rounds
+
+
+def calibrate_cost(target_seconds: float, min_cost: int = 10, max_cost: int = 16):
+    # Time one hash per cost on this host and pick the highest cost that stays
+    # under the target. Each extra round doubles the time, so stop early.
+    timings = {}
+    chosen = min_cost
+    for cost in range(min_cost, max_cost + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds=cost))
+        timings[cost] = time.perf_counter() - start
+        if timings[cost] > target_seconds:
+            break
+        chosen = cost
+    return chosen, timings
+
+
+class PasswordPool:
+    def __init__(self, workers: int = 0, max_queue: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        # Concurrent callers of the same broken executor replace it only once
+        if self._executor is broken:
+            RESTARTS.inc()
+            self._executor = None
+            broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, histogram: metrics.Histogram, func, *args):
+        # Fail fast instead of letting requests pile up behind a full pool
+        if self.in_flight >= self.workers + self.max_queue:
+            REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.start()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # A dead worker (e.g. OOM-killed) breaks the executor for good: replace it and retry once
+                self._restart(executor)
+                return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            histogram.observe(time.perf_counter() - start)
+
+
+pool = PasswordPool(settings.password_pool_workers, settings.password_pool_max_queue)
+
+metrics.gauge("password_pool_workers", "Processes in the password pool", lambda: pool.workers)
+metrics.gauge("password_pool_in_flight", "Password operations running or waiting", lambda: pool.in_flight)
+metrics.gauge("password_pool_queue_depth", "Password operations waiting for a free worker", lambda: pool.queue_depth)
+
+
+async def hash_password(password: str) -> str:
+    # Pass the cost explicitly so workers never disagree with the parent's settings
+    return await pool.run(HASH_SECONDS, get_password_hash, password, settings.bcrypt_rounds)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await pool.run(VERIFY_SECONDS, verify_password, plain_password, hashed_password)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+from compression import available_encodings, precompress_file
+
+# Usage: python precompress.py [directory]
+# Writes .br/.gz siblings for every compressible static file (run at build
+# time; the /uploads mount otherwise creates them on the first request).
+directory = sys.argv[1] if len(sys.argv) > 1 else "uploads"
+
+written = 0
+for root, _, files in os.walk(directory):
+    for name in files:
+        if name.endswith((".br", ".gz", ".tmp")):
+            continue
+        path = os.path.join(root, name)
+        for encoding in available_encodings():
+            sibling = precompress_file(path, encoding)
+            if sibling:
+                written += 1
+                print(f"   {sibling}")
+
+print(f"{written} precompressed file(s) up to date in {directory}")
@@ -0,0 +1,134 @@
+import abc
+import math
+import sqlite3
+import threading
+import time
+
+import anyio
+from fastapi import HTTPException, Request, status
+
+from config import settings
+import metrics
+
+# Token-bucket throttling for the bcrypt-heavy auth endpoints. Buckets hold up
+# to `limit` tokens and refill continuously at `limit / window` tokens per
+# second; each attempt takes one token.
+
+HITS = metrics.counter("rate_limit_hits_total", "Requests rejected by the auth rate limiter")
+
+
+class RateLimitBackend(abc.ABC):
+    # Returns 0 when a token was taken, otherwise the seconds until one is available
+    @abc.abstractmethod
+    async def consume(self, key: str, capacity: float, refill_rate: float) -> float:
+        ...
+
+
+def _take(tokens: float, updated: float, now: float, capacity: float, refill_rate: float):
+    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / refill_rate
+
+
+class MemoryBackend(RateLimitBackend):
+    # Per-process buckets; each uvicorn worker enforces its own limits
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    async def consume(self, key, capacity, refill_rate):
+        # Never blocks for long: a dict update under a lock
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, 0))
+            tokens, retry_after = _take(tokens, updated, now, capacity, refill_rate)
+            # Each bucket keeps how long its own limit takes to refill completely
+            self._buckets[key] = (tokens, now, capacity / refill_rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        for key in [k for k, (_, updated, full_after) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+
+class SQLiteBackend(RateLimitBackend):
+    # Buckets stored in a local SQLite file so all workers on a host share them
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    async def consume(self, key, capacity, refill_rate):
+        # BEGIN IMMEDIATE may wait on another worker's lock: keep it off the event loop
+        return await anyio.to_thread.run_sync(self._consume, key, capacity, refill_rate)
+
+    def _consume(self, key, capacity, refill_rate):
+        now = time.time()  # wall clock, shared between processes
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, retry_after = _take(tokens, updated, now, capacity, refill_rate)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, window: float):
+        self.backend = backend
+        self.window = window
+
+    async def hit(self, scope: str, key: str, limit: int):
+        retry_after = await self.backend.consume(f"{scope}:{key}", limit, limit / self.window)
+        if retry_after > 0:
+            HITS.inc(scope=scope)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+
+def client_ip(request: Request) -> str:
+    if settings.trust_forwarded_for:
+        # The proxy appends the address it saw, so the last entry is the trustworthy one
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _make_backend() -> RateLimitBackend:
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteBackend(settings.rate_limit_sqlite_path)
+    return MemoryBackend()
+
+
+limiter = RateLimiter(_make_backend(), settings.rate_limit_window)
@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import os
+import socket
+import sys
+import time
+import uuid
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import or_, select, update
+
+from config import settings
+import models
+import repository
+import storage
+from database import AsyncSessionLocal, async_engine, writer_engine
+
+# Orphaned file reconciler. Walks the storage backend in key order, a batch
+# at a time, and moves files that no document, blob or team logo refers to
+# into quarantine/<UTC time>/<key>. Quarantined files are deleted once older
+# than RECONCILE_RETENTION, or moved back if something refers to them again
+# by then. The position of the walk is kept in reconcile_state, so a pass
+# interrupted by a restart resumes where it stopped. Each batch runs under a
+# lease on that row: app workers and cron runs take turns instead of racing.
+#
+#   python reconcile.py             # one full pass
+#   python reconcile.py --dry-run   # only report what would be quarantined / deleted
+QUARANTINE_PREFIX = "quarantine/"
+# Sorts after every quarantined key: the walk jumps there instead of listing them
+AFTER_QUARANTINE = QUARANTINE_PREFIX + "\U0010ffff"
+STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+# Precompressed copies next to static files (see compression.PrecompressedStaticFiles)
+SIBLING_SUFFIXES = (".gz", ".br")
+LOOKUP_CHUNK = 500  # keys per IN (...) lookup
+LEASE_SECONDS = 15 * 60  # a batch whose process died is taken over after this
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Report:
+    scanned: int = 0
+    quarantined: int = 0
+    quarantined_bytes: int = 0
+    restored: int = 0
+    deleted: int = 0
+    reclaimed_bytes: int = 0
+
+    def add(self, other: "Report"):
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+    def __str__(self):
+        return (
+            f"scanned {self.scanned} files, quarantined {self.quarantined} ({_mb(self.quarantined_bytes)}), "
+            f"restored {self.restored}, deleted {self.deleted}, reclaimed {_mb(self.reclaimed_bytes)}"
+        )
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def quarantine_key(key: str, moment: float) -> str:
+    return f"{QUARANTINE_PREFIX}{time.strftime(STAMP_FORMAT, time.gmtime(moment))}/{key}"
+
+
+def _url_key(url: Optional[str]) -> Optional[str]:
+    if url and url.startswith("/uploads/"):
+        return url[len("/uploads/"):]
+    return None
+
+
+def _base(key: str) -> str:
+    for suffix in SIBLING_SUFFIXES:
+        if key.endswith(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+async def referenced_keys(keys: Iterable[str]) -> Set[str]:
+    # The subset of `keys` still in use. A precompressed sibling is in use
+    # when its original is. Each call reads in a fresh transaction, so it
+    # sees rows committed while the batch was running.
+    keys = list(keys)
+    if not keys:
+        return set()
+    names = set(keys) | {_base(key) for key in keys}
+    used = {_url_key(models.DEFAULT_LOGO_URL)}
+    async with AsyncSessionLocal() as db:
+        # Teams are few: read every logo rather than matching URLs
+        for logo_url, variants in (await db.execute(select(models.Team.logo_url, models.Team.logo_variants))).all():
+            used.add(_url_key(logo_url))
+            for formats in (variants or {}).values():
+                used.update(_url_key(url) for url in formats.values())
+        names = sorted(names)
+        for i in range(0, len(names), LOOKUP_CHUNK):
+            chunk = names[i:i + LOOKUP_CHUNK]
+            used.update((await db.execute(repository.document_keys_in_use_query(chunk))).scalars())
+            shas = [name.rsplit("/", 1)[-1] for name in chunk if name.startswith("blobs/")]
+            if shas:
+                used.update((await db.execute(select(models.Blob.path).where(models.Blob.sha256.in_(shas)))).scalars())
+    return {key for key in keys if key in used or _base(key) in used}
+
+
+async def _restore(quarantined: str, key: str) -> Optional[bool]:
+    # Moves a quarantined file back, unless a new file was stored under its
+    # key meanwhile (e.g. a logo uploaded again with the same name): the new
+    # file is kept and the quarantined copy dropped. True when restored, False
+    # when dropped, None when another run already handled it.
+    try:
+        if await storage.backend.stat(key) is None:
+            await storage.backend.move(quarantined, key)
+            return True
+    except FileNotFoundError:
+        return None
+    await storage.backend.delete(quarantined)
+    return False
+
+
+def _count_restore(report: Report, outcome: Optional[bool], size: int):
+    if outcome:
+        report.restored += 1
+    elif outcome is False:
+        report.deleted += 1
+        report.reclaimed_bytes += size
+
+
+async def scan_batch(cursor: str, now: float, limit: int, dry_run: bool = False) -> Tuple[Report, Optional[str]]:
+    # Quarantines the orphans among the next `limit` keys after `cursor`.
+    # Returns the cursor for the next batch, None at the end of the pass.
+    report = Report()
+    listed = await storage.backend.list_keys(start_after=cursor, limit=limit)
+    candidates = {}
+    for key, stat in listed:
+        if key.startswith(QUARANTINE_PREFIX):
+            continue
+        report.scanned += 1
+        # Younger files may be an upload whose row is not committed yet
+        if stat.mtime < now - settings.reconcile_grace:
+            candidates[key] = stat
+
+    used = await referenced_keys(candidates)
+    moved = []
+    for key, stat in candidates.items():
+        if key in used:
+            continue
+        if not dry_run:
+            try:
+                await storage.backend.move(key, quarantine_key(key, now))
+            except FileNotFoundError:
+                continue  # removed in the meantime
+            moved.append(key)
+        report.quarantined += 1
+        report.quarantined_bytes += stat.size
+
+    # An upload may have started using one of them while they were moved.
+    # One whose reference was not committed yet by this recheck finds the
+    # file gone when it re-stats the key after its commit, and writes it again
+    # (see blobs.ensure_upload); _restore() then keeps that copy.
+    for key in await referenced_keys(moved):
+        _count_restore(report, await _restore(quarantine_key(key, now), key), candidates[key].size)
+
+    if len(listed) < limit:
+        return report, None
+    last = listed[-1][0]
+    return report, max(last, AFTER_QUARANTINE) if last.startswith(QUARANTINE_PREFIX) else last
+
+
+async def expire_batch(now: float, limit: int, dry_run: bool = False) -> Report:
+    # Deletes (or restores) up to `limit` files quarantined before the retention
+    report = Report()
+    cutoff = time.strftime(STAMP_FORMAT, time.gmtime(now - settings.reconcile_retention))
+    expired = {}
+    for key, stat in await storage.backend.list_keys(QUARANTINE_PREFIX, limit=limit):
+        parts = key[len(QUARANTINE_PREFIX):].split("/", 1)
+        if len(parts) != 2:
+            continue
+        if parts[0] >= cutoff:
+            break  # listed oldest first
+        expired[key] = (parts[1], stat)
+
+    used = await referenced_keys(original for original, _ in expired.values())
+    for key, (original, stat) in expired.items():
+        if original in used:
+            # Restored files and siblings are counted one by one
+            if dry_run:
+                report.restored += 1
+            else:
+                _count_restore(report, await _restore(key, original), stat.size)
+        else:
+            if not dry_run:
+                await storage.backend.delete(key)
+            report.deleted += 1
+            report.reclaimed_bytes += stat.size
+    return report
+
+
+async def _acquire_lease(owner: str) -> Optional[str]:
+    # The saved cursor ("" at the start of a pass), or None while another
+    # process holds an unexpired lease
+    now = datetime.utcnow()
+    state = models.ReconcileState
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            update(state)
+            .where(state.id == 1, or_(state.lease_owner.is_(None), state.lease_expires_at < now))
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=LEASE_SECONDS))
+            .returning(state.cursor)
+        )).first()
+        await db.commit()
+    return None if row is None else row.cursor or ""
+
+
+async def _release_lease(owner: str, **values) -> bool:
+    # Saves `values` and frees the row, unless the lease expired and was taken over
+    state = models.ReconcileState
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(state)
+            .where(state.id == 1, state.lease_owner == owner)
+            .values(lease_owner=None, lease_expires_at=None, **values)
+        )
+        await db.commit()
+    return result.rowcount == 1
+
+
+async def run_batch(now: float = None, limit: int = None) -> Optional[Tuple[Report, bool]]:
+    # One resumable step: the next batch of the walk, then expired quarantine.
+    # Returns the report and whether the pass is complete, or None when
+    # another process is running a batch.
+    now = time.time() if now is None else now
+    limit = limit or settings.reconcile_batch_size
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    cursor = await _acquire_lease(owner)
+    if cursor is None:
+        return None
+    try:
+        report, next_cursor = await scan_batch(cursor, now, limit)
+        report.add(await expire_batch(now, limit))
+    except BaseException:
+        # Keep the position; the next batch retries from there
+        await _release_lease(owner)
+        raise
+
+    values = {
+        "cursor": next_cursor,
+        "reclaimed_bytes": models.ReconcileState.reclaimed_bytes + report.reclaimed_bytes,
+    }
+    if not cursor:
+        values["pass_started_at"] = datetime.utcfromtimestamp(now)
+    if not await _release_lease(owner, **values):
+        logger.warning("Reconciler lease expired during a batch; its position was not saved")
+    return report, next_cursor is None
+
+
+async def run_pass(now: float = None, limit: int = None, dry_run: bool = False) -> Optional[Report]:
+    # None when another process held the lease from the start; a pass that
+    # another process takes over midway stops there and reports its share
+    total = Report()
+    if dry_run:
+        # Walks from the start without moving anything or saving the position
+        now = time.time() if now is None else now
+        limit = limit or settings.reconcile_batch_size
+        cursor = ""
+        while cursor is not None:
+            report, cursor = await scan_batch(cursor, now, limit, dry_run=True)
+            total.add(report)
+        total.add(await expire_batch(now, sys.maxsize, dry_run=True))
+        return total
+    started = False
+    while True:
+        result = await run_batch(now, limit)
+        if result is None:
+            return total if started else None
+        started = True
+        report, done = result
+        total.add(report)
+        if done:
+            return total
+
+
+async def run_forever(interval: int):
+    # Background loop started by main.py when RECONCILE_INTERVAL is set
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await run_batch()
+        except Exception:
+            logger.exception("Reconciler batch failed")
+            continue
+        if result is not None and (result[0].quarantined or result[0].deleted or result[0].restored):
+            logger.info("Reconciler: %s", result[0])
+
+
+async def _main(dry_run: bool):
+    try:
+        report = await run_pass(dry_run=dry_run)
+    finally:
+        # Pooled aiosqlite connections would keep the process alive
+        await async_engine.dispose()
+        if writer_engine is not None:
+            await writer_engine.dispose()
+    if report is None:
+        print("Another reconciler is running; try again later")
+        sys.exit(1)
+    print(f"{'Dry run: ' if dry_run else ''}{report}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(dry_run="--dry-run" in sys.argv))
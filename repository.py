@@ -0,0 +1,176 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+import models
+
+# Statements for the hot read paths. Routes execute these, and
+# test_query_plans.py EXPLAINs the very same statements to make sure each
+# one is served by an index.
+
+
+def documents_with_uploader_query():
+    # Rows of (Document, uploader_name) in one joined query instead of one
+    # users lookup per document
+    return select(
+        models.Document,
+        func.coalesce(models.User.full_name, "Unknown").label("uploader_name")
+    ).outerjoin(models.User, models.User.id == models.Document.uploaded_by)
+
+
+def document_listing_query():
+    # Flat rows labelled like schemas.DocumentResponse, so listings are read
+    # straight into the response without building ORM objects or dicts
+    return select(
+        models.Document.id,
+        models.Document.team_id,
+        models.Document.filename,
+        models.Document.uploaded_by,
+        models.Document.uploaded_at,
+        models.Document.status,
+        models.Document.admin_comment,
+        func.coalesce(models.User.full_name, "Unknown").label("uploader_name")
+    ).outerjoin(models.User, models.User.id == models.Document.uploaded_by)
+
+
+def pending_documents_query(team_id: int = None):
+    query = document_listing_query().where(
+        models.Document.status == models.DocumentStatus.PENDING
+    )
+    if team_id is not None:
+        query = query.where(models.Document.team_id == team_id)
+    return query
+
+
+def team_documents_query(team_id: int, status: models.DocumentStatus = None):
+    query = document_listing_query().where(models.Document.team_id == team_id)
+    if status is not None:
+        query = query.where(models.Document.status == status)
+    return query
+
+
+def team_archive_query(team_id: int, status: models.DocumentStatus = None):
+    query = (
+        select(models.Document.filename, models.Document.file_path, models.Document.uploaded_at)
+        .where(models.Document.team_id == team_id)
+        .order_by(models.Document.uploaded_at, models.Document.id)
+    )
+    if status is not None:
+        query = query.where(models.Document.status == status)
+    return query
+
+
+def document_keys_in_use_query(keys):
+    # Which of these storage keys documents still point to (orphan reconciler)
+    return select(models.Document.file_path).where(models.Document.file_path.in_(keys))
+
+
+def document_with_uploader_query(doc_id: int):
+    return documents_with_uploader_query().where(models.Document.id == doc_id)
+
+
+def document_dict(document: models.Document, uploader_name: str) -> dict:
+    return {
+        "id": document.id,
+        "team_id": document.team_id,
+        "filename": document.filename,
+        "uploaded_by": document.uploaded_by,
+        "uploaded_at": document.uploaded_at,
+        "status": document.status,
+        "admin_comment": document.admin_comment,
+        "uploader_name": uploader_name
+    }
+
+
+def document_status_counts_query():
+    # One pass over the status index for every dashboard document counter
+    return select(models.Document.status, func.count(models.Document.id)).group_by(models.Document.status)
+
+
+def team_count_query():
+    return select(func.count(models.Team.id))
+
+
+def student_count_query():
+    return select(func.count(models.User.id)).where(models.User.role == models.UserRole.STUDENT)
+
+
+def teams_with_member_count_query(status: models.TeamStatus = None):
+    # Flat rows labelled like schemas.TeamResponse from a single outer-join aggregate
+    query = (
+        select(
+            models.Team.id,
+            models.Team.name,
+            models.Team.theme,
+            models.Team.sub_theme,
+            models.Team.sub_theme_status,
+            func.coalesce(models.Team.logo_url, models.DEFAULT_LOGO_URL).label("logo_url"),
+            models.Team.logo_variants,
+            models.Team.created_at,
+            models.Team.status,
+            func.count(models.User.id).label("member_count")
+        )
+        .outerjoin(models.User, models.User.team_id == models.Team.id)
+        .group_by(models.Team.id)
+    )
+    if status is not None:
+        query = query.where(models.Team.status == status)
+    return query
+
+
+def team_detail_query(team_id: int):
+    # Team and its roster in one joined query (call .unique() on the result)
+    return (
+        select(models.Team)
+        .options(joinedload(models.Team.members))
+        .where(models.Team.id == team_id)
+    )
+
+
+def users_query(role: models.UserRole = None, is_active: bool = None, team_id: int = None):
+    query = select(models.User)
+    if role is not None:
+        query = query.where(models.User.role == role)
+    if is_active is not None:
+        query = query.where(models.User.is_active == is_active)
+    if team_id is not None:
+        query = query.where(models.User.team_id == team_id)
+    return query
+
+
+def students_query(**filters):
+    return users_query(role=models.UserRole.STUDENT, **filters)
+
+
+def pending_users_query(team_id: int = None):
+    return students_query(is_active=False, team_id=team_id)
+
+
+def _version(model, *criteria):
+    # (row count, latest update) changes whenever a matching row is added,
+    # edited or removed, without reading the rows themselves
+    return (
+        select(func.count(model.id)).where(*criteria).scalar_subquery(),
+        select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),
+    )
+
+
+def users_version_query():
+    # Cross-worker principal cache invalidation (see auth.refresh_principals)
+    return select(*_version(models.User))
+
+
+def teams_version_query():
+    # Team listings also depend on who is assigned where (member counts)
+    return select(*_version(models.Team), *_version(models.User, models.User.team_id.isnot(None)))
+
+
+def team_version_query(team_id: int):
+    return select(*_version(models.Team, models.Team.id == team_id), *_version(models.User, models.User.team_id == team_id))
+
+
+def team_documents_version_query(team_id: int):
+    # Members are included for the uploader names
+    return select(
+        *_version(models.Document, models.Document.team_id == team_id),
+        *_version(models.User, models.User.team_id == team_id),
+    )
@@ -1,126 +1,112 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from database import get_async_db
 import models
 import schemas
-from auth import get_current_admin
-from typing import List
+import repository
+import stats
+from auth import get_current_admin, invalidate_principal, Principal
+from pagination import PageParams, keyset, finish
+from serializers import json_list_response
+from typing import List, Optional
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
 @router.get("/dashboard", response_model=schemas.DashboardStats)
-def get_dashboard_stats(
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+async def get_dashboard_stats(
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    total_users = db.query(models.User).filter(models.User.role == models.UserRole.STUDENT).count()
-    total_teams = db.query(models.Team).count()
-    total_documents = db.query(models.Document).count()
-    pending_documents = db.query(models.Document).filter(
-        models.Document.status == models.DocumentStatus.PENDING
-    ).count()
-    approved_documents = db.query(models.Document).filter(
-        models.Document.status == models.DocumentStatus.APPROVED
-    ).count()
-    rejected_documents = db.query(models.Document).filter(
-        models.Document.status == models.DocumentStatus.REJECTED
-    ).count()
-    
-    return {
-        "total_users": total_users,
-        "total_teams": total_teams,
-        "total_documents": total_documents,
-        "pending_documents": pending_documents,
-        "approved_documents": approved_documents,
-        "rejected_documents": rejected_documents
-    }
+    # One primary-key read with USE_STATS_TABLE, otherwise three aggregate queries
+    return await stats.dashboard(db)
 
 @router.get("/documents/pending", response_model=List[schemas.DocumentResponse])
-def get_pending_documents(
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+async def get_pending_documents(
+    request: Request,
+    response: Response,
+    team_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    documents = db.query(models.Document).filter(
-        models.Document.status == models.DocumentStatus.PENDING
-    ).all()
-    
-    result = []
-    for doc in documents:
-        uploader = db.query(models.User).filter(models.User.id == doc.uploaded_by).first()
-        result.append({
-            "id": doc.id,
-            "team_id": doc.team_id,
-            "filename": doc.filename,
-            "uploaded_by": doc.uploaded_by,
-            "uploaded_at": doc.uploaded_at,
-            "status": doc.status,
-            "admin_comment": doc.admin_comment,
-            "uploader_name": uploader.full_name if uploader else "Unknown"
-        })
-    
-    return result
+    query = keyset(repository.pending_documents_query(team_id), models.Document.uploaded_at, models.Document.id, page)
+    rows = (await db.execute(query)).all()
+    rows = finish(rows, page, request, response, key=lambda r: (r.uploaded_at, r.id))
+    return json_list_response(schemas.DocumentResponse, rows, response)
 
 @router.get("/users", response_model=List[schemas.UserResponse])
-def get_all_users(
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+async def get_all_users(
+    request: Request,
+    response: Response,
+    role: models.UserRole = models.UserRole.STUDENT,
+    is_active: Optional[bool] = None,
+    team_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    users = db.query(models.User).filter(models.User.role == models.UserRole.STUDENT).all()
-    return users
+    query = keyset(repository.users_query(role, is_active, team_id), models.User.created_at, models.User.id, page)
+    users = (await db.scalars(query)).all()
+    users = finish(users, page, request, response, key=lambda u: (u.created_at, u.id))
+    return json_list_response(schemas.UserResponse, users, response)
 
 @router.get("/users/pending", response_model=List[schemas.UserResponse])
-def get_pending_users(
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+async def get_pending_users(
+    request: Request,
+    response: Response,
+    team_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    users = db.query(models.User).filter(
-        models.User.role == models.UserRole.STUDENT,
-        models.User.is_active == False
-    ).all()
-    return users
+    query = keyset(repository.pending_users_query(team_id), models.User.created_at, models.User.id, page)
+    users = (await db.scalars(query)).all()
+    users = finish(users, page, request, response, key=lambda u: (u.created_at, u.id))
+    return json_list_response(schemas.UserResponse, users, response)
 
 @router.put("/users/{user_id}/approve")
-def approve_user(
+async def approve_user(
     user_id: int,
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.is_active = True
-    db.commit()
+    await db.commit()
+    invalidate_principal(user_id)
     
     return {"message": "User approved successfully"}
 
 @router.put("/teams/{team_id}/validate-sub-theme")
-def validate_sub_theme(
+async def validate_sub_theme(
     team_id: int,
     status: models.ValidationStatus,
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+    team = await db.scalar(select(models.Team).where(models.Team.id == team_id))
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
         
     team.sub_theme_status = status
     # If REJECTED, we keep the text so they know what was rejected, but frontend should allow edit
     
-    db.commit()
+    await db.commit()
     
     return {"message": f"Sub-theme {status}", "status": status}
 
 @router.put("/users/{user_id}")
-def update_user(
+async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -129,25 +115,28 @@ def update_user(
     if user_update.email is not None:
         # Check uniqueness if email changes
         if user_update.email != user.email:
-            existing = db.query(models.User).filter(models.User.email == user_update.email).first()
+            existing = await db.scalar(select(models.User).where(models.User.email == user_update.email))
             if existing:
                 raise HTTPException(status_code=400, detail="Email already registered")
         user.email = user_update.email
     if user_update.role is not None:
+        if user_update.role != user.role:
+            await stats.bump(db, total_users=1 if user_update.role == models.UserRole.STUDENT else -1)
         user.role = user_update.role
     if user_update.is_active is not None:
         user.is_active = user_update.is_active
         
-    db.commit()
+    await db.commit()
+    invalidate_principal(user_id)
     return {"message": "User updated successfully"}
 
 @router.delete("/users/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int,
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
@@ -157,7 +146,10 @@ def delete_user(
     # Given database.py doesn't specify cascade, we might error if we delete a user with related data.
     # But for now let's try simple delete.
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    if user.role == models.UserRole.STUDENT:
+        await stats.bump(db, total_users=-1)
+    await db.commit()
+    invalidate_principal(user_id)
     
     return {"message": "User deleted successfully"}
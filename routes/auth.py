@@ -1,16 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncSessionLocal
 import models
 import schemas
-from auth import get_password_hash, verify_password, create_access_token, ADMIN_CODE, get_current_user
+from auth import create_access_token, ADMIN_CODE, get_current_user, Principal
+from passwords import hash_password, check_password, needs_rehash
+from config import settings
+from rate_limit import limiter, client_ip
+from etags import not_modified
+import dataclasses
+import stats
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+async def _get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def _rehash_password(user_id: int, password: str, old_hash: str):
+    # Upgrade hashes made at another bcrypt cost, without forcing a reset
+    try:
+        new_hash = await hash_password(password)
+    except HTTPException:
+        return  # Pool saturated: try again on the next login
+    async with AsyncSessionLocal() as db:
+        # Only replace the hash we verified, in case the password changed meanwhile
+        await db.execute(
+            update(models.User)
+            .where(models.User.id == user_id, models.User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await db.commit()
+
+# bcrypt runs in the password process pool, keeping the event loop free
 @router.post("/register", response_model=schemas.Token)
-def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: schemas.UserCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Throttle before any DB or bcrypt work
+    await limiter.hit("register_ip", client_ip(request), settings.register_ip_limit)
+    
     # Check if user already exists
-    existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+    existing_user = await _get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,15 +57,17 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
     # Create new user
     new_user = models.User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await hash_password(user_data.password),
         full_name=user_data.full_name,
         role=role,
         is_active=is_active
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    if role == models.UserRole.STUDENT:
+        await stats.bump(db, total_users=1)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(data={"sub": str(new_user.id)})
@@ -48,10 +79,19 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=schemas.Token)
-def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(
+    credentials: schemas.UserLogin,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Throttle before any DB or bcrypt work
+    await limiter.hit("login_ip", client_ip(request), settings.login_ip_limit)
+    await limiter.hit("login_email", credentials.email.lower(), settings.login_email_limit)
+    
     # Find user
-    user = db.query(models.User).filter(models.User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password_hash):
+    user = await _get_user_by_email(db, credentials.email)
+    if not user or not await check_password(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -63,6 +103,9 @@ def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
             detail="Your account is pending approval by an administrator"
         )
     
+    if needs_rehash(user.password_hash):
+        background_tasks.add_task(_rehash_password, user.id, credentials.password, user.password_hash)
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
     
@@ -73,5 +116,6 @@ def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.get("/me", response_model=schemas.UserResponse)
-def get_current_user_info(current_user: models.User = Depends(get_current_user)):
-    return current_user
+async def get_current_user_info(request: Request, response: Response, current_user: Principal = Depends(get_current_user)):
+    # The cached principal is the whole response, so it is also the version
+    return not_modified(request, response, *dataclasses.astuple(current_user)) or current_user
@@ -1,29 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 import models
 import schemas
-from auth import get_current_user, get_current_admin
-from typing import List
+import repository
+import stats
+from auth import get_current_user, get_current_admin, Principal
+from pagination import PageParams, keyset, finish
+from serializers import json_list_response
+from etags import not_modified
+import archives
+import blobs
+import downloads
+import search
+from starlette.responses import StreamingResponse
+from typing import List, Optional
 import os
-import shutil
-from datetime import datetime
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
 
-UPLOAD_DIR = "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 ALLOWED_EXTENSIONS = [".ppt", ".pptx", ".doc", ".docx", ".pdf"]
 
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 @router.post("/upload", response_model=schemas.DocumentResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user has a team
     if not current_user.team_id:
@@ -40,51 +45,40 @@ async def upload_document(
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Read file content to check size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024} MB"
-        )
-    
-    # Create unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"team{current_user.team_id}_{timestamp}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Identical content is stored once and shared (see blobs.py)
+    blob = await blobs.store(db, file, MAX_FILE_SIZE)
     
     # Create database record
     document = models.Document(
         team_id=current_user.team_id,
         filename=file.filename,
-        file_path=file_path,
-        uploaded_by=current_user.id
+        file_path=blob.path,
+        uploaded_by=current_user.id,
+        size=blob.size,
+        sha256=blob.sha256
     )
     
     db.add(document)
-    db.commit()
-    db.refresh(document)
-    
-    return {
-        "id": document.id,
-        "team_id": document.team_id,
-        "filename": document.filename,
-        "uploaded_by": document.uploaded_by,
-        "uploaded_at": document.uploaded_at,
-        "status": document.status,
-        "admin_comment": document.admin_comment,
-        "uploader_name": current_user.full_name
-    }
+    await db.flush()
+    # Searchable by name right away, by content once the text is extracted
+    await search.add(db, document)
+    await stats.bump(db, **stats.document_status_change(None, models.DocumentStatus.PENDING))
+    await db.commit()
+    await blobs.ensure_upload(blob, file, MAX_FILE_SIZE)
+    await db.refresh(document)
+    background_tasks.add_task(search.index_document, document.id)
+    
+    return repository.document_dict(document, current_user.full_name)
 
 @router.get("/team/{team_id}", response_model=List[schemas.DocumentResponse])
-def get_team_documents(
+async def get_team_documents(
     team_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    status_filter: Optional[models.DocumentStatus] = Query(None, alias="status"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     # Students can only see their own team's documents
     if current_user.role == models.UserRole.STUDENT and current_user.team_id != team_id:
@@ -93,74 +87,132 @@ def get_team_documents(
             detail="You can only view your own team's documents"
         )
     
-    documents = db.query(models.Document).filter(models.Document.team_id == team_id).all()
-    
-    result = []
-    for doc in documents:
-        uploader = db.query(models.User).filter(models.User.id == doc.uploaded_by).first()
-        result.append({
-            "id": doc.id,
-            "team_id": doc.team_id,
-            "filename": doc.filename,
-            "uploaded_by": doc.uploaded_by,
-            "uploaded_at": doc.uploaded_at,
-            "status": doc.status,
-            "admin_comment": doc.admin_comment,
-            "uploader_name": uploader.full_name if uploader else "Unknown"
-        })
-    
-    return result
+    version = (await db.execute(repository.team_documents_version_query(team_id))).one()
+    unchanged = not_modified(request, response, team_id, *version)
+    if unchanged:
+        return unchanged
+    
+    query = keyset(repository.team_documents_query(team_id, status_filter), models.Document.uploaded_at, models.Document.id, page)
+    rows = (await db.execute(query)).all()
+    rows = finish(rows, page, request, response, key=lambda r: (r.uploaded_at, r.id))
+    return json_list_response(schemas.DocumentResponse, rows, response)
+
+@router.get("/team/{team_id}/archive")
+async def download_team_archive(
+    team_id: int,
+    status_filter: Optional[models.DocumentStatus] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.role == models.UserRole.STUDENT and current_user.team_id != team_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only download your own team's documents"
+        )
+    
+    team = await db.get(models.Team, team_id)
+    if not team:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Team not found"
+        )
+    
+    # Only the file list is read up front; the files themselves are streamed into the ZIP
+    entries = (await db.execute(repository.team_archive_query(team_id, status_filter))).all()
+    return StreamingResponse(
+        archives.stream_archive(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": downloads.content_disposition(f"{team.name}.zip"),
+            "Cache-Control": "private, no-store",
+        },
+    )
+
+@router.get("/search", response_model=List[schemas.DocumentResponse])
+async def search_documents(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    team_id: Optional[int] = None,
+    status_filter: Optional[models.DocumentStatus] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Students search their own team's documents only
+    if current_user.role == models.UserRole.STUDENT:
+        if team_id is not None and team_id != current_user.team_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only search your own team's documents"
+            )
+        if not current_user.team_id:
+            return []
+        team_id = current_user.team_id
+    
+    query = search.search_query(db.get_bind().dialect.name, q, team_id, status_filter, limit)
+    if query is None:
+        return []
+    rows = (await db.execute(query)).all()
+    return json_list_response(schemas.DocumentResponse, rows, response)
 
 @router.get("/my-documents", response_model=List[schemas.DocumentResponse])
-def get_my_documents(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_documents(
+    request: Request,
+    response: Response,
+    status_filter: Optional[models.DocumentStatus] = Query(None, alias="status"),
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.team_id:
         return []
     
-    return get_team_documents(current_user.team_id, db, current_user)
+    return await get_team_documents(current_user.team_id, request, response, status_filter, page, db, current_user)
 
 @router.put("/{doc_id}/validate", response_model=schemas.DocumentResponse)
-def validate_document(
+async def validate_document(
     doc_id: int,
     validation: schemas.DocumentValidation,
-    current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_admin: Principal = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    document = db.query(models.Document).filter(models.Document.id == doc_id).first()
-    if not document:
+    row = (await db.execute(repository.document_with_uploader_query(doc_id))).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Document not found"
         )
+    document, uploader_name = row
+    
+    # Only if the status is still the one read above: of two concurrent
+    # validations, one applies its counter change and the other gets a 409.
+    # The loaded document is updated along with the row.
+    old_status = document.status
+    result = await db.execute(
+        update(models.Document)
+        .where(models.Document.id == doc_id, models.Document.status == old_status)
+        .values(status=validation.status, admin_comment=validation.admin_comment)
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document was changed by another request, reload it and try again"
+        )
+    await stats.bump(db, **stats.document_status_change(old_status, validation.status))
     
-    document.status = validation.status
-    document.admin_comment = validation.admin_comment
-    
-    db.commit()
-    db.refresh(document)
-    
-    uploader = db.query(models.User).filter(models.User.id == document.uploaded_by).first()
+    await db.commit()
     
-    return {
-        "id": document.id,
-        "team_id": document.team_id,
-        "filename": document.filename,
-        "uploaded_by": document.uploaded_by,
-        "uploaded_at": document.uploaded_at,
-        "status": document.status,
-        "admin_comment": document.admin_comment,
-        "uploader_name": uploader.full_name if uploader else "Unknown"
-    }
+    return repository.document_dict(document, uploader_name)
 
 @router.get("/{doc_id}/download")
-def download_document(
+async def download_document(
     doc_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    inline: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    document = db.query(models.Document).filter(models.Document.id == doc_id).first()
+    document = await db.scalar(select(models.Document).where(models.Document.id == doc_id))
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -174,14 +226,6 @@ def download_document(
             detail="You can only download your own team's documents"
         )
     
-    if not os.path.exists(document.file_path):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server"
-        )
-    
-    return FileResponse(
-        path=document.file_path,
-        filename=document.filename,
-        media_type="application/octet-stream"
-    )
+    # Ranges, validators and optional proxy offload (see downloads.py)
+    etag = f'"{document.sha256}"' if document.sha256 else None
+    return await downloads.send_file(request, document.file_path, document.filename, etag=etag, inline=inline)
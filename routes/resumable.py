@@ -0,0 +1,191 @@
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+import anyio
+from database import get_async_db
+from config import settings
+import models
+import schemas
+import repository
+import stats
+import blobs
+import search
+import upload_sessions
+from auth import get_current_user, Principal
+from routes.documents import ALLOWED_EXTENSIONS
+import os
+
+# Resumable uploads: create a session, PUT the bytes in as many requests as
+# needed (each one starting at the current Upload-Offset), GET the session to
+# find where to resume after a dropped connection, then complete it into a
+# Document. Abandoned sessions expire after UPLOAD_SESSION_TTL and are swept
+# by a background task (see main.py).
+router = APIRouter(prefix="/api/uploads", tags=["Uploads"])
+
+RESUMABLE_EXTENSIONS = ALLOWED_EXTENSIONS + [".mp4", ".mov", ".webm"]
+
+
+def _session_response(session: upload_sessions.UploadSession, response: Response) -> dict:
+    offset = session.offset()
+    response.headers["Upload-Offset"] = str(offset)
+    return {
+        "id": session.id,
+        "filename": session.filename,
+        "size": session.size,
+        "offset": offset,
+        "expires_at": session.expires_at()
+    }
+
+
+async def _get_session(upload_id: str, current_user: Principal) -> upload_sessions.UploadSession:
+    session = await anyio.to_thread.run_sync(upload_sessions.load, upload_id)
+    if session is None or session.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found or expired"
+        )
+    return session
+
+
+@asynccontextmanager
+async def _locked(session: upload_sessions.UploadSession):
+    # One request at a time per session, across workers: a second PUT would
+    # interleave its bytes, a second complete would find the file gone
+    try:
+        held = await anyio.to_thread.run_sync(upload_sessions.lock, session)
+    except upload_sessions.SessionBusy:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another request is in progress for this upload"
+        )
+    if held is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found or expired"
+        )
+    try:
+        yield
+    finally:
+        await anyio.to_thread.run_sync(held.release)
+
+
+@router.post("", response_model=schemas.UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload: schemas.UploadSessionCreate,
+    response: Response,
+    current_user: Principal = Depends(get_current_user)
+):
+    if not current_user.team_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must be assigned to a team to upload documents"
+        )
+    
+    file_ext = os.path.splitext(upload.filename)[1].lower()
+    if file_ext not in RESUMABLE_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(RESUMABLE_EXTENSIONS)}"
+        )
+    if not 0 < upload.size <= settings.max_resumable_upload_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size: {settings.max_resumable_upload_size / 1024 / 1024} MB"
+        )
+    
+    session = await anyio.to_thread.run_sync(
+        upload_sessions.create, current_user.id, os.path.basename(upload.filename), upload.size
+    )
+    return _session_response(session, response)
+
+
+@router.get("/{upload_id}", response_model=schemas.UploadSessionResponse)
+async def get_upload(upload_id: str, response: Response, current_user: Principal = Depends(get_current_user)):
+    session = await _get_session(upload_id, current_user)
+    return _session_response(session, response)
+
+
+@router.put("/{upload_id}", response_model=schemas.UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(...),
+    current_user: Principal = Depends(get_current_user)
+):
+    session = await _get_session(upload_id, current_user)
+    async with _locked(session):
+        offset = await anyio.to_thread.run_sync(session.offset)
+        if upload_offset != offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload offset mismatch: resume at {offset}",
+                headers={"Upload-Offset": str(offset)}
+            )
+        
+        # Bytes are written as they arrive, so a dropped request still keeps what
+        # was received and the client resumes from the new offset
+        async with await anyio.open_file(session.data_path, "r+b") as out:
+            await out.seek(offset)
+            async for chunk in request.stream():
+                if offset + len(chunk) > session.size:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Chunk goes past the declared upload size"
+                    )
+                await out.write(chunk)
+                offset += len(chunk)
+        
+        return _session_response(session, response)
+
+
+@router.post("/{upload_id}/complete", response_model=schemas.DocumentResponse)
+async def complete_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    session = await _get_session(upload_id, current_user)
+    if not current_user.team_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must be assigned to a team to upload documents"
+        )
+    async with _locked(session):
+        offset = await anyio.to_thread.run_sync(session.offset)
+        if offset != session.size:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload incomplete: {offset} of {session.size} bytes received",
+                headers={"Upload-Offset": str(offset)}
+            )
+        
+        blob = await blobs.adopt(db, session.data_path)
+        document = models.Document(
+            team_id=current_user.team_id,
+            filename=session.filename,
+            file_path=blob.path,
+            uploaded_by=current_user.id,
+            size=blob.size,
+            sha256=blob.sha256
+        )
+        db.add(document)
+        await db.flush()
+        await search.add(db, document)
+        await stats.bump(db, **stats.document_status_change(None, models.DocumentStatus.PENDING))
+        await db.commit()
+        await blobs.ensure_file(blob, session.data_path)
+        await db.refresh(document)
+        await anyio.to_thread.run_sync(upload_sessions.discard, session)
+        background_tasks.add_task(search.index_document, document.id)
+        
+        return repository.document_dict(document, current_user.full_name)
+
+
+@router.delete("/{upload_id}")
+async def cancel_upload(upload_id: str, current_user: Principal = Depends(get_current_user)):
+    session = await _get_session(upload_id, current_user)
+    async with _locked(session):
+        await anyio.to_thread.run_sync(upload_sessions.discard, session)
+    return {"message": "Upload cancelled"}
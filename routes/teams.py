@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from database import get_async_db
 import models
 import schemas
-from auth import get_current_user, get_current_admin
-from typing import List
+import repository
+import stats
+from auth import get_current_user, get_current_admin, invalidate_principal, Principal
+from pagination import PageParams, keyset, finish
+from etags import not_modified
+from serializers import json_list_response
+from typing import List, Optional
 import random
 from datetime import datetime
 
@@ -14,9 +19,9 @@ router = APIRouter(prefix="/api/teams", tags=["Teams"])
 THEMES = ["Élevage", "Agriculture", "Pêche"]
 
 @router.post("/create", response_model=dict)
-def create_teams(current_admin: models.User = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_teams(current_admin: Principal = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     # Check if teams already exist
-    existing_teams = db.query(models.Team).count()
+    existing_teams = await db.scalar(repository.team_count_query())
     if existing_teams > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -29,12 +34,13 @@ def create_teams(current_admin: models.User = Depends(get_current_admin), db: Se
         team = models.Team(
             name=f"Équipe {i}",
             theme=None,  # Theme assigned later via draw
-            logo_url="/uploads/logos/team_1_smile.gif"
+            logo_url=models.DEFAULT_LOGO_URL
         )
         db.add(team)
         teams_created.append(team)
     
-    db.commit()
+    await stats.bump(db, total_teams=len(teams_created))
+    await db.commit()
     
     return {
         "message": "Teams created successfully. Students must be assigned manually.",
@@ -43,37 +49,44 @@ def create_teams(current_admin: models.User = Depends(get_current_admin), db: Se
     }
 
 @router.get("", response_model=List[schemas.TeamResponse])
-def get_all_teams(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    teams = db.query(models.Team).all()
-    
-    # Add member count
-    result = []
-    for team in teams:
-        member_count = db.query(models.User).filter(models.User.team_id == team.id).count()
-        team_dict = {
-            "id": team.id,
-            "name": team.name,
-            "theme": team.theme,
-            "sub_theme": team.sub_theme,
-            "sub_theme_status": team.sub_theme_status,
-            "logo_url": team.logo_url or "/uploads/logos/team_1_smile.gif",
-            "created_at": team.created_at,
-            "status": team.status,
-            "member_count": member_count
-        }
-        result.append(team_dict)
-    
-    return result
+async def get_all_teams(
+    request: Request,
+    response: Response,
+    status_filter: Optional[models.TeamStatus] = Query(None, alias="status"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    unchanged = not_modified(request, response, *(await db.execute(repository.teams_version_query())).one())
+    if unchanged:
+        return unchanged
+    
+    # Teams and member counts in one aggregate query
+    query = keyset(repository.teams_with_member_count_query(status_filter), models.Team.created_at, models.Team.id, page)
+    rows = (await db.execute(query)).all()
+    rows = finish(rows, page, request, response, key=lambda r: (r.created_at, r.id))
+    return json_list_response(schemas.TeamResponse, rows, response)
 
 @router.get("/my-team", response_model=schemas.TeamDetail)
-def get_my_team(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_my_team(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     if not current_user.team_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="You are not assigned to any team yet"
         )
     
-    team = db.query(models.Team).filter(models.Team.id == current_user.team_id).first()
+    version = (await db.execute(repository.team_version_query(current_user.team_id))).one()
+    unchanged = not_modified(request, response, current_user.team_id, *version)
+    if unchanged:
+        return unchanged
+    
+    # Members are serialized in the response, load them in the same query
+    team = (await db.execute(repository.team_detail_query(current_user.team_id))).unique().scalar_one_or_none()
     if not team:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -81,13 +94,13 @@ def get_my_team(current_user: models.User = Depends(get_current_user), db: Sessi
         )
     
     if not team.logo_url:
-        team.logo_url = "/uploads/logos/team_1_smile.gif"
+        team.logo_url = models.DEFAULT_LOGO_URL
 
     return team
 
 @router.get("/{team_id}", response_model=schemas.TeamDetail)
-def get_team_by_id(team_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+async def get_team_by_id(team_id: int, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user)):
+    team = (await db.execute(repository.team_detail_query(team_id))).unique().scalar_one_or_none()
     if not team:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -95,22 +108,22 @@ def get_team_by_id(team_id: int, db: Session = Depends(get_db), current_user: mo
         )
     
     if not team.logo_url:
-        team.logo_url = "/uploads/logos/team_1_smile.gif"
+        team.logo_url = models.DEFAULT_LOGO_URL
 
     return team
 
 @router.post("/{team_id}/assign/{user_id}")
-def assign_member(
+async def assign_member(
     team_id: int, 
     user_id: int, 
-    current_admin: models.User = Depends(get_current_admin), 
-    db: Session = Depends(get_db)
+    current_admin: Principal = Depends(get_current_admin), 
+    db: AsyncSession = Depends(get_async_db)
 ):
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+    team = await db.scalar(select(models.Team).where(models.Team.id == team_id))
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
         
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
@@ -118,24 +131,25 @@ def assign_member(
         raise HTTPException(status_code=400, detail="User already in a team")
         
     user.team_id = team_id
-    db.commit()
+    await db.commit()
+    invalidate_principal(user_id)
     
     return {"message": "User assigned successfully"}
 
 @router.post("/draw-theme")
-def draw_theme(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def draw_theme(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.team_id:
         raise HTTPException(status_code=400, detail="User not in a team")
         
-    team = db.query(models.Team).filter(models.Team.id == current_user.team_id).first()
+    team = await db.scalar(select(models.Team).where(models.Team.id == current_user.team_id))
     if team.theme:
         raise HTTPException(status_code=400, detail="Team already has a theme")
         
     # Get used themes
-    used_themes = [t.theme for t in db.query(models.Team).filter(models.Team.theme != None).all()]
+    used_themes = (await db.scalars(select(models.Team.theme).where(models.Team.theme != None))).all()
     available_themes = [t for t in THEMES if t not in used_themes]
     
     if not available_themes:
@@ -144,41 +158,41 @@ def draw_theme(
     # Randomly pick
     selected_theme = random.choice(available_themes)
     team.theme = selected_theme
-    db.commit()
+    await db.commit()
     
     return {"theme": selected_theme}
 
 @router.put("/rename")
-def rename_team(
+async def rename_team(
     new_name: str,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.team_id:
         raise HTTPException(status_code=400, detail="User not in a team")
         
-    team = db.query(models.Team).filter(models.Team.id == current_user.team_id).first()
+    team = await db.scalar(select(models.Team).where(models.Team.id == current_user.team_id))
     
     # Check uniqueness
-    existing = db.query(models.Team).filter(models.Team.name == new_name).first()
+    existing = await db.scalar(select(models.Team).where(models.Team.name == new_name))
     if existing and existing.id != team.id:
         raise HTTPException(status_code=400, detail="Team name already taken")
         
     team.name = new_name
-    db.commit()
+    await db.commit()
     
     return {"message": "Team renamed successfully", "name": new_name}
 
 @router.put("/sub-theme")
-def set_sub_theme(
+async def set_sub_theme(
     sub_theme: str,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.team_id:
         raise HTTPException(status_code=400, detail="User not in a team")
         
-    team = db.query(models.Team).filter(models.Team.id == current_user.team_id).first()
+    team = await db.scalar(select(models.Team).where(models.Team.id == current_user.team_id))
     
     if not team.theme:
          raise HTTPException(status_code=400, detail="Team must have a main theme first")
@@ -189,38 +203,38 @@ def set_sub_theme(
     
     team.sub_theme = sub_theme
     team.sub_theme_status = models.ValidationStatus.PENDING
-    db.commit()
+    await db.commit()
     
     return {"message": "Sub-theme set successfully. Awaiting admin approval.", "sub_theme": sub_theme, "status": "pending"}
 
-from fastapi import File, UploadFile
-import shutil
-import os
+from fastapi import BackgroundTasks, File, UploadFile
+import uploads
+import logos
+
+MAX_LOGO_SIZE = 2 * 1024 * 1024  # 2 MB
 
 @router.post("/logo")
-def upload_team_logo(
+async def upload_team_logo(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.team_id:
         raise HTTPException(status_code=400, detail="User not in a team")
         
-    team = db.query(models.Team).filter(models.Team.id == current_user.team_id).first()
-    
-    # Ensure upload dir exists
-    UPLOAD_DIR = "uploads/logos"
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    filename = f"team_{team.id}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    team = await db.scalar(select(models.Team).where(models.Team.id == current_user.team_id))
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    filename = f"team_{team.id}_{uploads.safe_filename(file.filename)}"
+    # Streamed in chunks and stored atomically, so the old logo is served until the new one is complete
+    await uploads.save_upload(file, f"logos/{filename}", MAX_LOGO_SIZE)
         
     # Update DB - store relative path
     relative_path = f"/uploads/logos/{filename}"
     team.logo_url = relative_path
-    db.commit()
+    team.logo_variants = None
+    await db.commit()
+    # Resized variants are rendered after the response and recorded on the team when ready
+    background_tasks.add_task(logos.process_logo, team.id, f"logos/{filename}")
     
     return {"logo_url": relative_path}
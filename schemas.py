@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from models import UserRole, DocumentStatus, TeamStatus
 
 # User Schemas
@@ -39,6 +39,7 @@ class TeamBase(BaseModel):
     sub_theme: Optional[str] = None
     sub_theme_status: Optional[str] = None
     logo_url: Optional[str] = None
+    logo_variants: Optional[Dict[str, Dict[str, str]]] = None
 
 class TeamCreate(TeamBase):
     pass
@@ -77,6 +78,17 @@ class DocumentResponse(DocumentBase):
     class Config:
         from_attributes = True
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int
+    expires_at: datetime
+
 class DocumentValidation(BaseModel):
     status: DocumentStatus
     admin_comment: Optional[str] = None
@@ -0,0 +1,201 @@
+import asyncio
+import io
+import os
+import re
+import sys
+import zipfile
+from xml.etree import ElementTree
+
+import anyio
+from sqlalchemy import cast, column, delete, func, insert, literal_column, select, table, update
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import repository
+import storage
+from database import AsyncSessionLocal, async_engine, writer_engine
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+except ImportError:  # optional: without pypdf, PDFs are searchable by name only
+    PdfReader = None
+    PyPdfError = ValueError
+
+# Full-text search over document names and contents (migration 0009): an
+# FTS5 table on SQLite, a weighted tsvector with a GIN index on Postgres.
+# The name is indexed in the upload transaction; the text is extracted by a
+# background task and filled in afterwards. `python search.py` extracts the
+# text of documents that have none yet (e.g. those uploaded before the index).
+SEARCH_CONFIG = "french"  # Postgres text search configuration, as in migration 0009
+MAX_EXTRACT_SIZE = 50 * 1024 * 1024  # larger files are searchable by name only
+MAX_TEXT_LENGTH = 200_000  # characters kept per document
+MAX_TERMS = 8
+
+WORD = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DRAWING = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+SLIDE = re.compile(r"^ppt/slides/slide(\d+)\.xml$")
+
+EXTRACT_ERRORS = (zipfile.BadZipFile, ElementTree.ParseError, KeyError, ValueError, OSError, PyPdfError)
+
+
+def _ooxml_text(fileobj, members, prefix: str) -> str:
+    # Runs (<t>) of one paragraph (<p>) are joined as is, paragraphs with a space
+    parts, length = [], 0
+    with zipfile.ZipFile(fileobj) as archive:
+        for name in members(archive.namelist()):
+            with archive.open(name) as member:
+                for _, element in ElementTree.iterparse(member):
+                    if element.tag == f"{prefix}t" and element.text:
+                        parts.append(element.text)
+                        length += len(element.text)
+                    elif element.tag == f"{prefix}p":
+                        parts.append(" ")
+                        element.clear()
+                    if length > MAX_TEXT_LENGTH:
+                        return "".join(parts)
+    return "".join(parts)
+
+
+def _docx_text(fileobj) -> str:
+    return _ooxml_text(fileobj, lambda names: ["word/document.xml"], WORD)
+
+
+def _pptx_text(fileobj) -> str:
+    def slides(names):
+        numbered = [(int(m.group(1)), name) for name in names for m in [SLIDE.match(name)] if m]
+        return [name for _, name in sorted(numbered)]
+    return _ooxml_text(fileobj, slides, DRAWING)
+
+
+def _pdf_text(fileobj) -> str:
+    parts, length = [], 0
+    for page in PdfReader(fileobj).pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length > MAX_TEXT_LENGTH:
+            break
+    return "\n".join(parts)
+
+
+EXTRACTORS = {".docx": _docx_text, ".pptx": _pptx_text}
+if PdfReader is not None:
+    EXTRACTORS[".pdf"] = _pdf_text
+
+
+def extract_text(filename: str, data: bytes) -> str:
+    # Plain text of a document, "" for legacy .doc/.ppt and unreadable files
+    extractor = EXTRACTORS.get(os.path.splitext(filename)[1].lower())
+    if extractor is None:
+        return ""
+    try:
+        text = extractor(io.BytesIO(data))
+    except EXTRACT_ERRORS:
+        return ""
+    return " ".join(text.split())[:MAX_TEXT_LENGTH]
+
+
+def _index(dialect_name: str):
+    # The FTS5 table is keyed by its rowid; the Postgres table by document_id
+    key = "rowid" if dialect_name == "sqlite" else "document_id"
+    index = table("document_search", column(key), column("filename"), column("content"), column("vector"))
+    return index, index.c[key]
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+async def add(db: AsyncSession, document: models.Document):
+    # In the upload transaction (the document must be flushed)
+    index, key = _index(_dialect(db))
+    await db.execute(insert(index).values({key.name: document.id, "filename": document.filename, "content": ""}))
+
+
+async def remove(db: AsyncSession, document_id: int):
+    # FTS5 tables have no foreign keys, so deletes are explicit on every database
+    index, key = _index(_dialect(db))
+    await db.execute(delete(index).where(key == document_id))
+
+
+async def index_document(document_id: int):
+    # Background task scheduled after an upload
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(models.Document.filename, models.Document.file_path, models.Document.size)
+            .where(models.Document.id == document_id)
+        )).first()
+    if row is None or os.path.splitext(row.filename)[1].lower() not in EXTRACTORS:
+        return
+    if row.size is not None and row.size > MAX_EXTRACT_SIZE:
+        return
+    try:
+        data = await storage.backend.get(row.file_path)
+    except FileNotFoundError:
+        return
+    content = await anyio.to_thread.run_sync(extract_text, row.filename, data)
+    if not content:
+        return
+    async with AsyncSessionLocal() as db:
+        index, key = _index(_dialect(db))
+        await db.execute(update(index).where(key == document_id).values(content=content))
+        await db.commit()
+
+
+def terms(text: str):
+    return re.findall(r"\w+", text.lower())[:MAX_TERMS]
+
+
+def search_query(dialect_name: str, text: str, team_id: int = None,
+                 status: models.DocumentStatus = None, limit: int = 20):
+    # Ranked rows labelled like schemas.DocumentResponse, every term required
+    # (as a prefix); a match in the name outweighs one in the content.
+    # None when the text has no searchable term.
+    words = terms(text)
+    if not words:
+        return None
+    index, key = _index(dialect_name)
+    query = repository.document_listing_query().join(index, key == models.Document.id)
+    if dialect_name == "sqlite":
+        match = " ".join(f'"{word}"*' for word in words)
+        fts = literal_column("document_search")
+        query = query.where(fts.op("MATCH")(match)).order_by(func.bm25(fts, 10.0, 1.0), models.Document.id)
+    else:
+        tsquery = func.to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), " & ".join(f"{word}:*" for word in words))
+        query = query.where(index.c.vector.op("@@")(tsquery)).order_by(
+            func.ts_rank_cd(index.c.vector, tsquery).desc(), models.Document.id
+        )
+    if team_id is not None:
+        query = query.where(models.Document.team_id == team_id)
+    if status is not None:
+        query = query.where(models.Document.status == status)
+    return query.limit(limit)
+
+
+async def reindex(everything: bool = False) -> int:
+    async with AsyncSessionLocal() as db:
+        index, key = _index(_dialect(db))
+        query = select(key)
+        if not everything:
+            query = query.where(index.c.content == "")
+        document_ids = (await db.execute(query)).scalars().all()
+    for document_id in document_ids:
+        await index_document(document_id)
+    return len(document_ids)
+
+
+async def _main(everything: bool):
+    try:
+        count = await reindex(everything)
+    finally:
+        # Pooled aiosqlite connections would keep the process alive
+        await async_engine.dispose()
+        if writer_engine is not None:
+            await writer_engine.dispose()
+    print(f"Extracted text for {count} document(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(everything="--all" in sys.argv))
@@ -0,0 +1,28 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# Fast path for large listings. Rows (ORM objects, or flat Row tuples whose
+# labels match the schema) are validated once, straight from attributes, and
+# pydantic-core writes the JSON bytes directly. Returning the Response skips
+# FastAPI's second response_model validation and the jsonable_encoder pass;
+# response_model stays on the route for the OpenAPI schema.
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_list(model, rows) -> bytes:
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def json_list_response(model, rows, response: Optional[Response] = None) -> Response:
+    # Headers set on the injected response (ETag, cursors) are not merged by
+    # FastAPI when a Response is returned, so carry them over
+    headers = dict(response.headers) if response is not None else None
+    return Response(dump_list(model, rows), media_type="application/json", headers=headers)
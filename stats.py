@@ -0,0 +1,111 @@
+import sys
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+import models
+import repository
+
+# Materialized dashboard counters (see models.Stats). Writers call bump()
+# before committing so the counters change in the same transaction as the
+# rows they count. `python stats.py` checks them against the real tables and
+# `python stats.py --rebuild` resets them.
+
+STATUS_COLUMNS = {
+    models.DocumentStatus.PENDING: "pending_documents",
+    models.DocumentStatus.APPROVED: "approved_documents",
+    models.DocumentStatus.REJECTED: "rejected_documents",
+}
+COUNTER_COLUMNS = ["total_users", "total_teams"] + list(STATUS_COLUMNS.values())
+
+
+def document_status_change(old_status, new_status) -> dict:
+    if old_status == new_status:
+        return {}
+    deltas = {STATUS_COLUMNS[new_status]: 1}
+    if old_status is not None:
+        deltas[STATUS_COLUMNS[old_status]] = -1
+    return deltas
+
+
+async def bump(db: AsyncSession, **deltas):
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not settings.use_stats_table or not deltas:
+        return
+    await db.execute(
+        update(models.Stats)
+        .where(models.Stats.id == 1)
+        .values({column: getattr(models.Stats, column) + delta for column, delta in deltas.items()})
+    )
+
+
+def _dashboard(counts: dict) -> dict:
+    return {
+        **counts,
+        "total_documents": sum(counts[column] for column in STATUS_COLUMNS.values()),
+    }
+
+
+def _counts(total_users: int, total_teams: int, status_rows) -> dict:
+    counts = {column: 0 for column in STATUS_COLUMNS.values()}
+    for status, count in status_rows:
+        counts[STATUS_COLUMNS[status]] = count
+    return {"total_users": total_users, "total_teams": total_teams, **counts}
+
+
+async def compute_counts(db: AsyncSession) -> dict:
+    return _counts(
+        await db.scalar(repository.student_count_query()),
+        await db.scalar(repository.team_count_query()),
+        await db.execute(repository.document_status_counts_query()),
+    )
+
+
+async def dashboard(db: AsyncSession) -> dict:
+    if settings.use_stats_table:
+        row = await db.get(models.Stats, 1)
+        if row is not None:
+            return _dashboard({column: getattr(row, column) for column in COUNTER_COLUMNS})
+    return _dashboard(await compute_counts(db))
+
+
+def check(db) -> dict:
+    # Sync consistency checker: returns {column: (stored, actual)} for each drift
+    actual = _counts(
+        db.scalar(repository.student_count_query()),
+        db.scalar(repository.team_count_query()),
+        db.execute(repository.document_status_counts_query()),
+    )
+    row = db.get(models.Stats, 1)
+    stored = {column: getattr(row, column) if row else None for column in COUNTER_COLUMNS}
+    return {column: (stored[column], actual[column]) for column in COUNTER_COLUMNS if stored[column] != actual[column]}
+
+
+def rebuild(db):
+    drift = check(db)
+    row = db.get(models.Stats, 1)
+    if row is None:
+        row = models.Stats(id=1)
+        db.add(row)
+    for column, (_, actual) in drift.items():
+        setattr(row, column, actual)
+    db.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        drift = rebuild(db) if "--rebuild" in sys.argv else check(db)
+    finally:
+        db.close()
+
+    if not drift:
+        print("Stats counters are consistent")
+    for column, (stored, actual) in drift.items():
+        action = "fixed" if "--rebuild" in sys.argv else "drift"
+        print(f"   {action}: {column} stored={stored} actual={actual}")
+    sys.exit(1 if drift and "--rebuild" not in sys.argv else 0)
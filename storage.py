@@ -0,0 +1,307 @@
+import abc
+import itertools
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+
+import anyio
+
+from config import settings
+
+try:
+    import boto3
+except ImportError:  # optional: only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+# Where uploaded documents and logos live. Keys are relative, "/"-separated
+# names such as "blobs/ab/<sha256>" or "logos/team_1_logo.png"; Document.file_path
+# holds the key. Writes are atomic: an object only becomes visible once all
+# of its bytes are stored.
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ObjectStat:
+    size: int
+    mtime: float  # seconds since the epoch
+
+
+class StorageBackend(abc.ABC):
+    @abc.abstractmethod
+    async def write(self, key: str, chunks: AsyncIterable[bytes]) -> int:
+        # Stores the streamed bytes and returns their count. If the iterator
+        # raises, nothing is stored and the error propagates.
+        ...
+
+    @abc.abstractmethod
+    async def put_file(self, key: str, path: str):
+        # Stores a copy of a complete local file; the file itself is left for
+        # the caller to remove
+        ...
+
+    @abc.abstractmethod
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        # Bytes start..end inclusive (to the end of the object by default)
+        ...
+
+    @abc.abstractmethod
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str):
+        # Missing keys are ignored
+        ...
+
+    @abc.abstractmethod
+    async def list_keys(self, prefix: str = "", start_after: str = "", limit: int = 1000) -> List[Tuple[str, ObjectStat]]:
+        # Up to `limit` keys under `prefix` that sort after `start_after`, in
+        # string order, so a walk can be resumed from the last key it saw
+        ...
+
+    async def move(self, src: str, dst: str):
+        # Raises FileNotFoundError when src is missing
+        if await self.stat(src) is None:
+            raise FileNotFoundError(src)
+        await self.write(dst, self.stream(src))
+        await self.delete(src)
+
+    def local_path(self, key: str) -> Optional[str]:
+        # Filesystem path when the object is a local file (used for X-Sendfile)
+        return None
+
+    async def put(self, key: str, data: bytes) -> int:
+        async def once():
+            yield data
+        return await self.write(key, once())
+
+    async def get(self, key: str) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(key)])
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, *key.split("/")))
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(self.root)]) != os.path.abspath(self.root):
+            raise ValueError(f"Storage key outside the storage root: {key}")
+        return path
+
+    async def write(self, key, chunks):
+        path = self.local_path(key)
+        await anyio.to_thread.run_sync(lambda: os.makedirs(os.path.dirname(path), exist_ok=True))
+        # Written next to the target and renamed into place once complete
+        tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.part")
+        size = 0
+        try:
+            async with await anyio.open_file(tmp_path, "wb") as out:
+                async for chunk in chunks:
+                    await out.write(chunk)
+                    size += len(chunk)
+            await anyio.to_thread.run_sync(os.replace, tmp_path, path)
+        except BaseException:
+            await self._remove(tmp_path)
+            raise
+        return size
+
+    async def put_file(self, key, path):
+        target = self.local_path(key)
+
+        def copy():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = os.path.join(os.path.dirname(target), f".{uuid.uuid4().hex}.part")
+            try:
+                # A hard link costs no copy; callers no longer write to the file
+                try:
+                    os.link(path, tmp_path)
+                except OSError:
+                    shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, target)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        await anyio.to_thread.run_sync(copy)
+
+    async def stream(self, key, start=0, end=None):
+        async with await anyio.open_file(self.local_path(key), "rb") as f:
+            await f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def stat(self, key):
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, self.local_path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return ObjectStat(size=stat_result.st_size, mtime=stat_result.st_mtime)
+
+    async def delete(self, key):
+        await self._remove(self.local_path(key))
+
+    def _walk(self, directory: str, prefix: str, start_after: str):
+        # Directories sort as "name/", which keeps the walk in key order
+        try:
+            entries = list(os.scandir(self.local_path(directory) if directory else self.root))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        named = sorted((entry.name + "/" if entry.is_dir(follow_symlinks=False) else entry.name, entry) for entry in entries)
+        for name, entry in named:
+            key = directory + name
+            if not (key.startswith(prefix) or prefix.startswith(key)):
+                continue
+            if name.endswith("/"):
+                # Skip subtrees that lie entirely before start_after
+                if key < start_after and not start_after.startswith(key):
+                    continue
+                yield from self._walk(key, prefix, start_after)
+            elif key > start_after and key.startswith(prefix):
+                stat_result = entry.stat(follow_symlinks=False)
+                yield key, ObjectStat(size=stat_result.st_size, mtime=stat_result.st_mtime)
+
+    async def list_keys(self, prefix="", start_after="", limit=1000):
+        return await anyio.to_thread.run_sync(
+            lambda: list(itertools.islice(self._walk("", prefix, start_after), limit))
+        )
+
+    async def move(self, src, dst):
+        source, target = self.local_path(src), self.local_path(dst)
+
+        def rename():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+
+        await anyio.to_thread.run_sync(rename)
+
+    @staticmethod
+    async def _remove(path: str):
+        try:
+            await anyio.to_thread.run_sync(os.remove, path)
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(StorageBackend):
+    # boto3 is synchronous, so every call runs in a worker thread. Writes use
+    # a multipart upload fed part by part from the stream (only one part is
+    # buffered in memory) and reads use ranged GetObject requests.
+    PART_SIZE = 8 * 1024 * 1024  # S3 parts must be at least 5 MB, except the last
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, **client_options):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+            client = boto3.client("s3", **{k: v for k, v in client_options.items() if v})
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def _call(self, method: str, **kwargs):
+        return await anyio.to_thread.run_sync(lambda: getattr(self.client, method)(Bucket=self.bucket, **kwargs))
+
+    async def write(self, key, chunks):
+        key = self._key(key)
+        upload_id = (await self._call("create_multipart_upload", Key=key))["UploadId"]
+        parts, buffer, size = [], bytearray(), 0
+
+        async def flush():
+            part_number = len(parts) + 1
+            response = await self._call(
+                "upload_part", Key=key, UploadId=upload_id, PartNumber=part_number, Body=bytes(buffer)
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            buffer.clear()
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                if len(buffer) >= self.PART_SIZE:
+                    await flush()
+            if buffer or not parts:
+                await flush()
+            await self._call("complete_multipart_upload", Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                await self._call("abort_multipart_upload", Key=key, UploadId=upload_id)
+            raise
+        return size
+
+    async def put_file(self, key, path):
+        # upload_file switches to a multipart upload by itself for large files
+        await anyio.to_thread.run_sync(lambda: self.client.upload_file(path, self.bucket, self._key(key)))
+
+    async def stream(self, key, start=0, end=None):
+        options = {}
+        if start or end is not None:
+            options["Range"] = f"bytes={start}-{'' if end is None else end}"
+        response = await self._call("get_object", Key=self._key(key), **options)
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await anyio.to_thread.run_sync(body.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def stat(self, key):
+        try:
+            response = await self._call("head_object", Key=self._key(key))
+        except self.client.exceptions.ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return ObjectStat(size=response["ContentLength"], mtime=response["LastModified"].timestamp())
+
+    async def delete(self, key):
+        await self._call("delete_object", Key=self._key(key))
+
+    async def list_keys(self, prefix="", start_after="", limit=1000):
+        keys = []
+        options = {"Prefix": self._key(prefix)}
+        if start_after:
+            options["StartAfter"] = self._key(start_after)
+        while len(keys) < limit:
+            response = await self._call("list_objects_v2", MaxKeys=min(limit - len(keys), 1000), **options)
+            for item in response.get("Contents", []):
+                stat = ObjectStat(size=item["Size"], mtime=item["LastModified"].timestamp())
+                keys.append((item["Key"][len(self.prefix):], stat))
+            if not response.get("IsTruncated"):
+                break
+            options["ContinuationToken"] = response["NextContinuationToken"]
+        return keys
+
+    async def move(self, src, dst):
+        # Server-side copy (single request up to 5 GB, above any upload limit here)
+        if await self.stat(src) is None:
+            raise FileNotFoundError(src)
+        await self._call("copy_object", Key=self._key(dst), CopySource={"Bucket": self.bucket, "Key": self._key(src)})
+        await self.delete(src)
+
+
+def _make_storage() -> StorageBackend:
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            settings.s3_bucket, settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url, region_name=settings.s3_region,
+        )
+    return LocalStorage(settings.storage_local_root)
+
+
+backend = _make_storage()
@@ -0,0 +1,87 @@
+import asyncio
+import io
+import os
+import zipfile
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import archives
+import storage
+
+
+@pytest.fixture
+def team_members(seed):
+    team = seed.team("Archive team")
+    student = seed.user(team=team)
+    outsider = seed.user(team=seed.team("Other archive team"), full_name="Outsider")
+    return team.id, *(seed.headers(user) for user in (student, outsider, seed.admin()))
+
+
+def _collect(entries):
+    async def run():
+        return b"".join([chunk async for chunk in archives.stream_archive(entries)])
+    return asyncio.run(run())
+
+
+def test_unique_names():
+    taken = set()
+    assert [archives.unique_name(n, taken) for n in ["a.pdf", "a.pdf", "../b.pdf", "a.pdf"]] == [
+        "a.pdf", "a (2).pdf", "b.pdf", "a (3).pdf"
+    ]
+
+
+def test_archive_is_streamed_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "backend", storage.LocalStorage(str(tmp_path)))
+    big = os.urandom(3 * 1024 * 1024 + 5)
+    asyncio.run(storage.backend.put("docs/big.pdf", big))
+    asyncio.run(storage.backend.put("docs/small.pdf", b"small"))
+    entries = [
+        SimpleNamespace(filename="big.pdf", file_path="docs/big.pdf", uploaded_at=datetime(2024, 5, 1, 12, 30)),
+        SimpleNamespace(filename="gone.pdf", file_path="docs/gone.pdf", uploaded_at=None),
+        SimpleNamespace(filename="small.pdf", file_path="docs/small.pdf", uploaded_at=datetime(1970, 1, 1)),
+    ]
+
+    async def run():
+        return [chunk async for chunk in archives.stream_archive(entries)]
+    chunks = asyncio.run(run())
+    # Sent while reading, not assembled at the end
+    assert len(chunks) > 3
+    assert max(len(chunk) for chunk in chunks) < len(big)
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["big.pdf", "small.pdf"]
+        assert archive.read("big.pdf") == big
+        assert archive.getinfo("big.pdf").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("big.pdf").date_time == (2024, 5, 1, 12, 30, 0)
+        assert archive.getinfo("small.pdf").date_time == archives.ZIP_EPOCH
+
+
+def test_empty_archive_is_valid():
+    with zipfile.ZipFile(io.BytesIO(_collect([]))) as archive:
+        assert archive.namelist() == []
+
+
+def test_team_archive_endpoint(client, team_members):
+    team_id, student, outsider, admin = team_members
+    first = client.post("/api/documents/upload", headers=student, files={"file": ("report.pdf", b"%PDF first")}).json()
+    client.post("/api/documents/upload", headers=student, files={"file": ("report.pdf", b"%PDF second")})
+    client.put(f"/api/documents/{first['id']}/validate", headers=admin, json={"status": "approved"})
+
+    response = client.get(f"/api/documents/team/{team_id}/archive", headers=student)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["content-disposition"].startswith("attachment")
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["report.pdf", "report (2).pdf"]
+        assert archive.read("report (2).pdf") == b"%PDF second"
+
+    response = client.get(f"/api/documents/team/{team_id}/archive", params={"status": "approved"}, headers=admin)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["report.pdf"]
+        assert archive.read("report.pdf") == b"%PDF first"
+
+    assert client.get(f"/api/documents/team/{team_id}/archive", headers=outsider).status_code == 403
+    assert client.get("/api/documents/team/999999/archive", headers=admin).status_code == 404
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+import blobs
+import models
+import search
+import stats
+import storage
+from database import AsyncSessionLocal, SessionLocal, async_engine, writer_engine
+
+
+@pytest.fixture
+def uploaders(seed):
+    team = seed.team("Blob team")
+    return [seed.headers(seed.user(team=team, full_name=f"Uploader {i}")) for i in range(2)]
+
+
+def _blob(sha256):
+    db = SessionLocal()
+    try:
+        return db.get(models.Blob, sha256)
+    finally:
+        db.close()
+
+
+def _document(doc_id):
+    db = SessionLocal()
+    try:
+        return db.get(models.Document, doc_id)
+    finally:
+        db.close()
+
+
+def _delete(doc_id):
+    # What deleting a document does to its stored file
+    async def scenario():
+        try:
+            async with AsyncSessionLocal() as db:
+                document = await db.get(models.Document, doc_id)
+                await db.delete(document)
+                await search.remove(db, doc_id)
+                unused_file = await blobs.release(db, document)
+                await db.commit()
+            await blobs.remove(unused_file)
+        finally:
+            # Pooled aiosqlite connections belong to the loop that opened them
+            await async_engine.dispose()
+            if writer_engine is not None:
+                await writer_engine.dispose()
+    asyncio.run(scenario())
+
+
+def test_identical_uploads_share_one_blob(client, uploaders):
+    content = b"%PDF-1.4 same deck " + os.urandom(50_000)
+    ids = []
+    for headers in uploaders:
+        response = client.post("/api/documents/upload", headers=headers, files={"file": ("deck.pdf", content)})
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+
+    first, second = _document(ids[0]), _document(ids[1])
+    assert first.file_path == second.file_path == blobs.blob_key(first.sha256)
+    path = storage.backend.local_path(first.file_path)
+    assert os.listdir(os.path.dirname(path)) == [first.sha256]
+    assert _blob(first.sha256).ref_count == 2
+
+    _delete(ids[0])
+    assert _blob(first.sha256).ref_count == 1
+    assert os.path.exists(path)
+
+    # The last reference drops the row; the file is left to the reconciler
+    _delete(ids[1])
+    assert _blob(first.sha256) is None
+    assert os.path.exists(path)
+
+
+def test_new_blob_row_writes_the_file_again(client, uploaders):
+    student = uploaders[0]
+    content = b"%PDF-1.4 uploaded again " + os.urandom(1000)
+    doc_id = client.post("/api/documents/upload", headers=student, files={"file": ("deck.pdf", content)}).json()["id"]
+    path = storage.backend.local_path(_document(doc_id).file_path)
+    _delete(doc_id)
+    # A leftover file from the released blob, damaged since
+    with open(path, "wb") as f:
+        f.write(b"truncated")
+
+    doc_id = client.post("/api/documents/upload", headers=student, files={"file": ("deck.pdf", content)}).json()["id"]
+    assert _blob(_document(doc_id).sha256).ref_count == 1
+    with open(path, "rb") as f:
+        assert f.read() == content
+
+
+def test_documents_from_before_blobs_delete_their_own_file(seed):
+    key = f"team1_{seed.unique()}_old.pdf"
+    legacy_file = storage.backend.local_path(key)
+    with open(legacy_file, "wb") as f:
+        f.write(b"old")
+    user = seed.user(team=seed.team("Blob team"))
+    document = models.Document(team_id=user.team_id, filename="old.pdf", file_path=key, uploaded_by=user.id)
+    seed.db.add(document)
+    seed.db.commit()
+
+    _delete(document.id)
+    assert not os.path.exists(legacy_file)
+
+
+def test_failed_commit_keeps_the_resumable_upload(client, uploaders, monkeypatch):
+    student = uploaders[0]
+    content = os.urandom(5000)
+    url = "/api/uploads/" + client.post("/api/uploads", headers=student, json={"filename": "a.pdf", "size": len(content)}).json()["id"]
+    client.put(url, headers={**student, "Upload-Offset": "0"}, content=content)
+
+    async def fail(db, **deltas):
+        raise RuntimeError("database went away")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(stats, "bump", fail)
+        with pytest.raises(RuntimeError):
+            client.post(f"{url}/complete", headers=student)
+    # The stored blob has no reference yet, and the client can retry
+    assert _blob(hashlib.sha256(content).hexdigest()) is None
+    assert client.get(url, headers=student).json()["offset"] == len(content)
+
+    response = client.post(f"{url}/complete", headers=student)
+    assert response.status_code == 200
+    assert _blob(_document(response.json()["id"]).sha256).ref_count == 1
+    assert client.get(url, headers=student).status_code == 404
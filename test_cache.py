@@ -0,0 +1,44 @@
+import time
+
+import auth
+import models
+from cache import LRUTTLCache
+
+
+def test_lru_eviction_and_counters():
+    cache = LRUTTLCache("test_lru", max_size=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"  # 1 is now most recently used
+    cache.set(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert cache._hits.value() == 3
+    assert cache._misses.value() == 1
+
+
+def test_ttl_expiry_and_invalidate():
+    cache = LRUTTLCache("test_ttl", max_size=10, ttl=0.05)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.invalidate(2)
+    assert cache.get(2) is None
+    time.sleep(0.06)
+    assert cache.get(1) is None
+
+
+def test_changes_from_other_workers_clear_the_principal_cache(client, seed):
+    user = seed.user(team=seed.team("Cache team"))
+    headers = seed.headers(user)
+    client.portal.call(auth.refresh_principals)
+    assert client.get("/api/auth/me", headers=headers).json()["role"] == "student"
+    assert auth.principal_cache.get(user.id) is not None
+
+    # Another worker promotes the user; its invalidate_principal() only
+    # reaches its own cache
+    user.role = models.UserRole.ADMIN
+    seed.db.commit()
+    client.portal.call(auth.refresh_principals)
+    assert auth.principal_cache.get(user.id) is None
+    assert client.get("/api/auth/me", headers=headers).json()["role"] == "admin"
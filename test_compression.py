@@ -0,0 +1,95 @@
+import gzip
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, PrecompressedStaticFiles, negotiate
+
+BIG_JSON = b"[" + b",".join(b'{"id": %d, "name": "row"}' % i for i in range(500)) + b"]"
+
+
+def _app(static_dir=None):
+    routes = [
+        Route("/big", lambda request: Response(BIG_JSON, media_type="application/json")),
+        Route("/small", lambda request: Response(b'{"ok": true}', media_type="application/json")),
+        Route("/gif", lambda request: Response(b"GIF89a" + b"\0" * 5000, media_type="image/gif")),
+        Route("/stream", lambda request: StreamingResponse(iter([BIG_JSON, BIG_JSON]), media_type="text/plain")),
+    ]
+    if static_dir:
+        routes.append(Mount("/static", PrecompressedStaticFiles(directory=static_dir)))
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("identity") is None
+    assert negotiate("*") in ("br", "gzip")
+    if compression.brotli is not None:
+        assert negotiate("gzip, br") == "br"
+        assert negotiate("gzip, br;q=0.5") == "gzip"
+
+
+def test_large_json_is_compressed():
+    response = _app().get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG_JSON)
+    assert response.content == BIG_JSON
+
+
+def test_small_and_incompressible_bodies_are_untouched():
+    client = _app()
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/gif", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_streaming_response_is_compressed():
+    response = _app().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == BIG_JSON * 2
+
+
+def test_static_sibling_is_created_once_and_served(tmp_path):
+    (tmp_path / "logo.svg").write_bytes(b"<svg>" + b"<g/>" * 1000 + b"</svg>")
+    client = _app(str(tmp_path))
+
+    response = client.get("/static/logo.svg", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert response.content == (tmp_path / "logo.svg").read_bytes()
+    sibling = tmp_path / "logo.svg.gz"
+    assert gzip.decompress(sibling.read_bytes()) == (tmp_path / "logo.svg").read_bytes()
+
+    mtime = os.stat(sibling).st_mtime_ns
+    response = client.get("/static/logo.svg", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert os.stat(sibling).st_mtime_ns == mtime
+
+    response = client.get("/static/logo.svg", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+
+def test_static_images_are_not_precompressed(tmp_path):
+    (tmp_path / "logo.gif").write_bytes(b"GIF89a" + b"\0" * 5000)
+    response = _app(str(tmp_path)).get("/static/logo.gif", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert not (tmp_path / "logo.gif.gz").exists()
+
+
+def test_brotli_when_available():
+    pytest.importorskip("brotli")
+    import brotli
+
+    response = _app().get("/big", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(response.content) == BIG_JSON
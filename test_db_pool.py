@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+
+import database
+from database import POOL_WAIT_SECONDS, InstrumentedQueuePool, create_sqlite_engines
+
+
+def _configure(monkeypatch):
+    monkeypatch.setattr(database.settings, "db_pool_size", 3)
+    monkeypatch.setattr(database.settings, "db_max_overflow", 2)
+    monkeypatch.setattr(database.settings, "db_pool_timeout", 7)
+    monkeypatch.setattr(database.settings, "db_pool_recycle", 900)
+
+
+def test_server_pool_follows_settings_and_records_waits(monkeypatch, tmp_path):
+    # The options the Postgres engines are built with, on a file database
+    _configure(monkeypatch)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, **database._pool_options())
+    try:
+        assert (engine.pool.size(), engine.pool._max_overflow, engine.pool.timeout()) == (3, 2, 7)
+        assert engine.pool._recycle == 900
+        before = POOL_WAIT_SECONDS.count
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert POOL_WAIT_SECONDS.count == before + 1
+    finally:
+        engine.dispose()
+
+
+def test_sqlite_reader_pool_follows_settings(monkeypatch, tmp_path):
+    _configure(monkeypatch)
+
+    async def scenario():
+        sync_engine, reader_engine, writer_engine = create_sqlite_engines(str(tmp_path / "app.db"))
+        try:
+            before = POOL_WAIT_SECONDS.count
+            async with reader_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            waits = POOL_WAIT_SECONDS.count - before
+            reader, writer = reader_engine.pool, writer_engine.pool
+            return (
+                (reader.size(), reader._max_overflow, reader.timeout()),
+                (writer.size(), writer._max_overflow, writer.timeout()),
+                waits,
+            )
+        finally:
+            await reader_engine.dispose()
+            await writer_engine.dispose()
+            sync_engine.dispose()
+
+    assert asyncio.run(scenario()) == ((3, 2, 7), (1, 0, 7), 1)
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import models
+from database import async_engine, writer_engine
+
+DOCUMENT_COUNT = 50
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = [e.sync_engine for e in (async_engine, writer_engine) if e is not None]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def team_with_documents(seed):
+    team = seed.team("Query count team")
+    students = [seed.user(team=team, full_name=f"Student {i}") for i in range(5)]
+    seed.db.add_all([
+        models.Document(team_id=team.id, filename=f"doc{i}.pdf", file_path=f"uploads/doc{i}.pdf",
+                        uploaded_by=students[i % len(students)].id)
+        for i in range(DOCUMENT_COUNT)
+    ])
+    seed.db.commit()
+    return team.id, seed.headers(seed.admin())
+
+
+def test_document_listings_do_not_query_per_row(client, team_with_documents):
+    team_id, headers = team_with_documents
+    # Warm the principal cache so only the listing itself is counted
+    client.get("/api/auth/me", headers=headers)
+
+    with count_queries() as statements:
+        response = client.get(f"/api/documents/team/{team_id}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == DOCUMENT_COUNT
+    assert {d["uploader_name"] for d in response.json()} == {f"Student {i}" for i in range(5)}
+    # The ETag version aggregate and the joined listing
+    assert len(statements) == 2, statements
+
+    with count_queries() as statements:
+        response = client.get("/api/admin/documents/pending", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) >= DOCUMENT_COUNT
+    assert len(statements) == 1, statements
+
+    doc_id = response.json()[0]["id"]
+    with count_queries() as statements:
+        response = client.put(f"/api/documents/{doc_id}/validate", headers=headers, json={"status": "approved"})
+    assert response.status_code == 200
+    assert response.json()["uploader_name"].startswith("Student")
+    # One joined read and one UPDATE
+    assert len(statements) == 2, statements
+
+
+def test_team_endpoints_use_single_query(client, team_with_documents):
+    team_id, headers = team_with_documents
+    client.get("/api/auth/me", headers=headers)
+
+    with count_queries() as statements:
+        response = client.get("/api/teams", headers=headers)
+    team = next(t for t in response.json() if t["id"] == team_id)
+    assert team["member_count"] == 5
+    # The ETag version aggregate and the listing
+    assert len(statements) == 2, statements
+
+    with count_queries() as statements:
+        response = client.get(f"/api/teams/{team_id}", headers=headers)
+    assert len(response.json()["members"]) == 5
+    assert len(statements) == 1, statements
@@ -0,0 +1,112 @@
+import hashlib
+import os
+
+import pytest
+
+from config import settings
+from downloads import parse_range
+
+CONTENT = bytes(range(256)) * 400
+
+
+@pytest.fixture
+def uploaded(client, seed):
+    headers = seed.headers(seed.user(team=seed.team("Download team"), full_name="Uploader"))
+    content = CONTENT + str(seed.unique()).encode()
+    doc_id = client.post("/api/documents/upload", headers=headers, files={"file": ("slides.pdf", content)}).json()["id"]
+    return f"/api/documents/{doc_id}/download", headers, content
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-2000", 1000) == (990, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("bytes=10-5", 1000) is None
+    assert parse_range("bytes=10-5", 0) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+    for header in ("bytes=-100", "bytes=0-", "bytes=0-0"):
+        with pytest.raises(ValueError):
+            parse_range(header, 0)
+
+
+def test_full_download_has_validators(client, uploaded):
+    url, headers, content = uploaded
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["cache-control"].startswith("private")
+    assert response.headers["content-disposition"].startswith("attachment")
+
+    response = client.get(url, headers={**headers, "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_byte_ranges(client, uploaded):
+    url, headers, content = uploaded
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    response = client.get(url, headers={**headers, "Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == content[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+
+    response = client.get(url, headers={**headers, "Range": "bytes=-10", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == content[-10:]
+
+    # A stale If-Range gets the whole current file instead of a mismatched slice
+    response = client.get(url, headers={**headers, "Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+    response = client.get(url, headers={**headers, "Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+    # An invalid range (last before first) is ignored, not refused
+    response = client.get(url, headers={**headers, "Range": "bytes=10-5"})
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_offload_to_proxy(client, uploaded, monkeypatch):
+    url, headers, content = uploaded
+    monkeypatch.setattr(settings, "download_offload", "x-accel-redirect")
+    response = client.get(url, headers=headers, params={"inline": True})
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"].startswith("/protected-uploads/blobs/")
+    assert response.headers["content-disposition"].startswith("inline")
+
+    monkeypatch.setattr(settings, "download_offload", "x-sendfile")
+    response = client.get(url, headers=headers)
+    assert os.path.isabs(response.headers["x-sendfile"])
+
+
+def test_storage_mount_serves_public_files(tmp_path, monkeypatch):
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.testclient import TestClient
+
+    import storage
+    from downloads import StorageFiles
+
+    monkeypatch.setattr(storage, "backend", storage.LocalStorage(str(tmp_path)))
+    (tmp_path / "logos").mkdir()
+    (tmp_path / "logos" / "team_1.png").write_bytes(b"PNG" * 100)
+    client = TestClient(Starlette(routes=[Mount("/uploads", StorageFiles())]))
+
+    response = client.get("/uploads/logos/team_1.png")
+    assert response.status_code == 200
+    assert response.content == b"PNG" * 100
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"].startswith("public")
+    assert client.get("/uploads/logos/missing.png").status_code == 404
+    assert client.get("/uploads/../secret").status_code == 404
@@ -0,0 +1,45 @@
+import pytest
+
+from etags import etag_matches, weak_etag
+
+
+@pytest.fixture
+def student(seed):
+    return seed.headers(seed.user(team=seed.team("ETag team")))
+
+
+def test_weak_comparison():
+    etag = weak_etag(1, 2)
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag[2:], etag)
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(weak_etag(1, 3), etag)
+
+
+@pytest.mark.parametrize("url", ["/api/auth/me", "/api/teams", "/api/teams/my-team", "/api/documents/my-documents"])
+def test_unchanged_poll_is_not_modified(client, student, url):
+    response = client.get(url, headers=student)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    response = client.get(url, headers={**student, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_etag_changes_with_the_data(client, seed, student):
+    etag = client.get("/api/teams/my-team", headers=student).headers["ETag"]
+    assert client.put("/api/teams/rename", headers=student, params={"new_name": f"Renamed {seed.unique()}"}).status_code == 200
+
+    response = client.get("/api/teams/my-team", headers={**student, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["name"].startswith("Renamed")
+
+
+def test_etag_depends_on_query_string(client, student):
+    first = client.get("/api/teams", headers=student, params={"limit": 1}).headers["ETag"]
+    assert client.get("/api/teams", headers=student, params={"limit": 2}).headers["ETag"] != first
@@ -0,0 +1,83 @@
+import asyncio
+import io
+
+import pytest
+
+import storage
+
+Image = pytest.importorskip("PIL.Image")
+
+import logos  # noqa: E402
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 255)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def student(seed):
+    team = seed.team("Logo team")
+    return team.id, seed.headers(seed.user(team=team, full_name="Designer"))
+
+
+def test_variants_fit_their_size_and_keep_aspect_ratio():
+    variants = logos.render_variants(_png(800, 400))
+    assert set(variants) == set(logos.SIZES)
+    for name, edge in logos.SIZES.items():
+        assert set(variants[name]) == set(logos.FORMATS)
+        for encoded in variants[name].values():
+            with Image.open(io.BytesIO(encoded)) as image:
+                assert image.size == (edge, edge // 2)
+
+
+def test_small_logos_are_not_upscaled():
+    with Image.open(io.BytesIO(logos.render_variants(_png(40, 40))["large"]["png"])) as image:
+        assert image.size == (40, 40)
+
+
+def test_variant_names_are_content_hashes():
+    assert logos.variant_key(b"a", "small", "webp") == logos.variant_key(b"a", "small", "webp")
+    assert logos.variant_key(b"a", "small", "webp") != logos.variant_key(b"b", "small", "webp")
+    assert logos.variant_key(b"a", "small", "webp").startswith(logos.VARIANT_PREFIX)
+
+
+def test_logo_upload_records_variants(client, student):
+    team_id, headers = student
+    response = client.post("/api/teams/logo", headers=headers, files={"file": ("logo.png", _png(500, 500))})
+    assert response.status_code == 200
+
+    # The background task has run by the time the test client returns
+    variants = client.get("/api/teams/my-team", headers=headers).json()["logo_variants"]
+    assert set(variants) == set(logos.SIZES)
+    key = variants["medium"]["webp"][len("/uploads/"):]
+    with Image.open(io.BytesIO(asyncio.run(storage.backend.get(key)))) as image:
+        assert image.format == "WEBP"
+        assert image.size == (160, 160)
+
+
+def test_unreadable_logo_keeps_only_the_original(client, student):
+    _, headers = student
+    response = client.post("/api/teams/logo", headers=headers, files={"file": ("logo.png", b"not an image")})
+    assert response.status_code == 200
+    team = client.get("/api/teams/my-team", headers=headers).json()
+    assert team["logo_url"] == response.json()["logo_url"]
+    assert team["logo_variants"] is None
+
+
+def test_variants_are_served_as_immutable(tmp_path):
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.testclient import TestClient
+
+    from compression import PrecompressedStaticFiles
+
+    (tmp_path / "logos" / "v").mkdir(parents=True)
+    (tmp_path / "logos" / "v" / "abc-small.png").write_bytes(_png(64, 64))
+    (tmp_path / "logos" / "team_1.png").write_bytes(_png(64, 64))
+    files = PrecompressedStaticFiles(directory=str(tmp_path), immutable_prefixes=[logos.VARIANT_PREFIX])
+    client = TestClient(Starlette(routes=[Mount("/uploads", files)]))
+
+    assert "immutable" in client.get("/uploads/logos/v/abc-small.png").headers["cache-control"]
+    assert "immutable" not in client.get("/uploads/logos/team_1.png").headers.get("cache-control", "")
@@ -0,0 +1,72 @@
+import pytest
+
+import models
+
+
+@pytest.fixture
+def paged_team(seed):
+    team, admin = seed.team("Paged team"), seed.admin()
+    seed.db.add_all([
+        models.Document(team_id=team.id, filename=f"doc{i}.pdf", file_path=f"uploads/doc{i}.pdf", uploaded_by=admin.id,
+                        status=models.DocumentStatus.APPROVED if i % 3 == 0 else models.DocumentStatus.PENDING)
+        for i in range(7)
+    ])
+    seed.db.commit()
+    return team.id, seed.headers(admin)
+
+
+def _walk(client, url, headers, **params):
+    ids, pages = [], 0
+    while True:
+        response = client.get(url, headers=headers, params=params)
+        assert response.status_code == 200
+        ids += [item["id"] for item in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            assert "Link" not in response.headers
+            return ids, pages
+        assert 'rel="next"' in response.headers["Link"]
+        params["cursor"] = cursor
+
+
+def test_cursor_walks_every_row_once(client, paged_team):
+    team_id, headers = paged_team
+    everything = client.get(f"/api/documents/team/{team_id}", headers=headers).json()
+
+    ids, pages = _walk(client, f"/api/documents/team/{team_id}", headers, limit=3)
+    assert ids == [d["id"] for d in everything]
+    assert len(ids) == 7
+    assert pages == 3
+
+
+def test_filters_are_applied_server_side(client, paged_team):
+    team_id, headers = paged_team
+    ids, _ = _walk(client, f"/api/documents/team/{team_id}", headers, status="approved", limit=2)
+    assert len(ids) == 3
+
+    ids, _ = _walk(client, "/api/admin/documents/pending", headers, team_id=team_id, limit=2)
+    assert len(ids) == 4
+
+
+def test_bad_cursor_and_limit_are_rejected(client, paged_team):
+    team_id, headers = paged_team
+    response = client.get(f"/api/documents/team/{team_id}", headers=headers, params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+    response = client.get(f"/api/documents/team/{team_id}", headers=headers, params={"limit": 0})
+    assert response.status_code == 422
+
+
+def test_lists_are_not_truncated_without_limit_or_cursor(client, paged_team, monkeypatch):
+    team_id, headers = paged_team
+    monkeypatch.setattr("pagination.settings.page_size_default", 2)
+    response = client.get(f"/api/documents/team/{team_id}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 7
+    assert "X-Next-Cursor" not in response.headers
+
+    first = client.get(f"/api/documents/team/{team_id}", headers=headers, params={"limit": 3})
+    cursor = first.headers["X-Next-Cursor"]
+    response = client.get(f"/api/documents/team/{team_id}", headers=headers, params={"cursor": cursor})
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" in response.headers
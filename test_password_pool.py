@@ -0,0 +1,80 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import passwords
+
+
+def _slow_identity(value, delay):
+    time.sleep(delay)
+    return value
+
+
+def test_hash_and_check_in_pool():
+    async def scenario():
+        pool = passwords.PasswordPool(workers=1, max_queue=1)
+        try:
+            hashed = await pool.run(passwords.HASH_SECONDS, passwords.get_password_hash, "password123")
+            ok = await pool.run(passwords.VERIFY_SECONDS, passwords.verify_password, "password123", hashed)
+            bad = await pool.run(passwords.VERIFY_SECONDS, passwords.verify_password, "wrong", hashed)
+        finally:
+            pool.shutdown()
+        return ok, bad
+
+    assert asyncio.run(scenario()) == (True, False)
+
+
+def test_saturated_pool_returns_503():
+    async def scenario():
+        pool = passwords.PasswordPool(workers=1, max_queue=1)
+        try:
+            # One running + one queued fills the pool, the third call is refused
+            busy = [asyncio.ensure_future(pool.run(passwords.HASH_SECONDS, _slow_identity, i, 0.5)) for i in range(2)]
+            await asyncio.sleep(0)
+            assert pool.queue_depth == 1
+            with pytest.raises(HTTPException) as exc:
+                await pool.run(passwords.HASH_SECONDS, _slow_identity, 3, 0)
+            assert exc.value.status_code == 503
+            return await asyncio.gather(*busy)
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(scenario()) == [0, 1]
+
+
+def test_pool_recovers_from_a_dead_worker():
+    async def scenario():
+        pool = passwords.PasswordPool(workers=1, max_queue=1)
+        try:
+            assert await pool.run(passwords.HASH_SECONDS, _slow_identity, 1, 0) == 1
+            broken = pool._executor
+            for pid in list(broken._processes):
+                os.kill(pid, signal.SIGKILL)
+            result = await pool.run(passwords.HASH_SECONDS, _slow_identity, 2, 0)
+            return result, pool._executor is not broken
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(scenario()) == (2, True)
+
+
+def test_needs_rehash_follows_configured_cost(monkeypatch):
+    hashed = passwords.get_password_hash("password123", rounds=4)
+    assert passwords.hash_cost(hashed) == 4
+    monkeypatch.setattr(passwords.settings, "bcrypt_rounds", 4)
+    assert not passwords.needs_rehash(hashed)
+    monkeypatch.setattr(passwords.settings, "bcrypt_rounds", 5)
+    assert passwords.needs_rehash(hashed)
+
+
+def test_metrics_are_admin_only(client, seed):
+    assert client.get("/metrics").status_code in (401, 403)
+    student = seed.user(team=seed.team("Metrics team"))
+    assert client.get("/metrics", headers=seed.headers(student)).status_code == 403
+    response = client.get("/metrics", headers=seed.headers(seed.admin()))
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
@@ -0,0 +1,121 @@
+import os
+import re
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import migrations
+import models
+import repository
+import search
+from pagination import PageParams, keyset
+
+# Every statement behind a hot endpoint must be answered through an index.
+# A plan that scans users or documents row by row fails the suite.
+PAGE = PageParams(cursor=None, limit=100)
+NEXT_PAGE = PageParams(cursor="WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwgNDJd", limit=100)
+
+
+def _documents_page(query, page=PAGE):
+    return keyset(query, models.Document.uploaded_at, models.Document.id, page)
+
+
+def _users_page(query, page=PAGE):
+    return keyset(query, models.User.created_at, models.User.id, page)
+
+
+HOT_QUERIES = {
+    "admin pending documents": _documents_page(repository.pending_documents_query()),
+    "admin pending documents, next page": _documents_page(repository.pending_documents_query(), NEXT_PAGE),
+    "admin pending documents by team": _documents_page(repository.pending_documents_query(1)),
+    "dashboard student count": repository.student_count_query(),
+    "team documents": _documents_page(repository.team_documents_query(1)),
+    "team documents, next page": _documents_page(repository.team_documents_query(1), NEXT_PAGE),
+    "team documents by status": _documents_page(repository.team_documents_query(1, models.DocumentStatus.PENDING)),
+    "team archive": repository.team_archive_query(1, models.DocumentStatus.APPROVED),
+    "teams with member counts": keyset(repository.teams_with_member_count_query(), models.Team.created_at, models.Team.id, PAGE),
+    "team roster": repository.team_detail_query(1),
+    "reconciler key lookup": repository.document_keys_in_use_query(["blobs/ab/abc", "logos/team_1_logo.png"]),
+    "teams version": repository.teams_version_query(),
+    "team version": repository.team_version_query(1),
+    "team documents version": repository.team_documents_version_query(1),
+    "admin students": _users_page(repository.students_query()),
+    "admin active students": _users_page(repository.students_query(is_active=True)),
+    "admin students by team": _users_page(repository.students_query(team_id=1)),
+    "admin pending users": _users_page(repository.pending_users_query()),
+    "admin pending users, next page": _users_page(repository.pending_users_query(), NEXT_PAGE),
+}
+
+# Whole-table aggregates cannot avoid visiting every row, but must do so
+# through a covering index rather than the table itself.
+AGGREGATE_QUERIES = {
+    "dashboard document counts": repository.document_status_counts_query(),
+}
+
+HOT_TABLES = ("users", "documents")
+
+
+def _sql(engine, query):
+    return str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    migrations.upgrade(engine)
+    return engine
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_sqlite_plan_uses_index(sqlite_engine, name):
+    with sqlite_engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + _sql(sqlite_engine, HOT_QUERIES[name])))]
+    # "SCAN <table>" (with or without an index) walks every row; "SEARCH" seeks
+    scans = [step for step in plan if re.match(rf"SCAN ({'|'.join(HOT_TABLES)})\b", step)]
+    assert not scans, f"{name} falls back to a full scan: {plan}"
+
+
+@pytest.mark.parametrize("name", AGGREGATE_QUERIES)
+def test_sqlite_aggregate_uses_covering_index(sqlite_engine, name):
+    with sqlite_engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + _sql(sqlite_engine, AGGREGATE_QUERIES[name])))]
+    scans = [step for step in plan if re.match(rf"SCAN ({'|'.join(HOT_TABLES)})\b(?! USING COVERING INDEX)", step)]
+    assert not scans, f"{name} reads the table instead of a covering index: {plan}"
+
+
+def test_sqlite_search_uses_fts_index(sqlite_engine):
+    query = search.search_query("sqlite", "serre bovins", team_id=1)
+    with sqlite_engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + _sql(sqlite_engine, query)))]
+    assert any(step.startswith("SCAN document_search VIRTUAL TABLE INDEX") for step in plan), plan
+    scans = [step for step in plan if re.match(rf"SCAN ({'|'.join(HOT_TABLES)})\b", step)]
+    assert not scans, f"search falls back to a full scan: {plan}"
+
+
+@pytest.fixture(scope="module")
+def postgres_engine():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_engine(url)
+    migrations.upgrade(engine)
+    return engine
+
+
+@pytest.mark.parametrize("name", {**HOT_QUERIES, **AGGREGATE_QUERIES})
+def test_postgres_plan_uses_index(postgres_engine, name):
+    query = {**HOT_QUERIES, **AGGREGATE_QUERIES}[name]
+    with postgres_engine.connect() as conn:
+        # Tiny test tables always favour a seq scan; forbid it to check an index can serve the query
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = [row[0] for row in conn.execute(text("EXPLAIN " + _sql(postgres_engine, query)))]
+    scans = [step for step in plan if re.search(rf"Seq Scan on ({'|'.join(HOT_TABLES)})\b", step)]
+    assert not scans, f"{name} falls back to a sequential scan: {plan}"
+
+
+def test_postgres_search_uses_gin_index(postgres_engine):
+    query = search.search_query("postgresql", "serre bovins", team_id=1)
+    with postgres_engine.connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = [row[0] for row in conn.execute(text("EXPLAIN " + _sql(postgres_engine, query)))]
+    assert any("ix_document_search_vector" in step for step in plan), plan
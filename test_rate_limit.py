@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from rate_limit import HITS, MemoryBackend, RateLimiter, SQLiteBackend
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_token_bucket_rejects_over_limit(backend_name, tmp_path):
+    if backend_name == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "limits.db"))
+    else:
+        backend = MemoryBackend()
+    limiter = RateLimiter(backend, window=60)
+    before = HITS.value(scope="login_email")
+
+    async def scenario():
+        for _ in range(3):
+            await limiter.hit("login_email", "a@b.com", 3)
+        with pytest.raises(HTTPException) as exc:
+            await limiter.hit("login_email", "a@b.com", 3)
+        # Other keys have their own bucket
+        await limiter.hit("login_email", "other@b.com", 3)
+        return exc.value
+
+    exc = asyncio.run(scenario())
+    assert exc.status_code == 429
+    assert int(exc.headers["Retry-After"]) >= 1
+    assert HITS.value(scope="login_email") == before + 1
+
+
+def test_sqlite_buckets_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first = RateLimiter(SQLiteBackend(path), window=60)
+    second = RateLimiter(SQLiteBackend(path), window=60)
+
+    async def scenario():
+        await first.hit("login_ip", "1.2.3.4", 1)
+        with pytest.raises(HTTPException):
+            await second.hit("login_ip", "1.2.3.4", 1)
+
+    asyncio.run(scenario())
+
+
+def test_memory_prune_uses_each_bucket_own_limit(monkeypatch):
+    backend = MemoryBackend(max_keys=2)
+    clock = [1000.0]
+    monkeypatch.setattr("rate_limit.time.monotonic", lambda: clock[0])
+
+    async def scenario():
+        # 5 per minute: full again after 60 s; 20 per hour: after an hour
+        await backend.consume("login_email:a", 5, 5 / 60)
+        await backend.consume("register_ip:b", 20, 20 / 3600)
+        clock[0] += 120
+        # A third key triggers pruning with a short limit of its own
+        await backend.consume("login_ip:c", 1, 1 / 10)
+
+    asyncio.run(scenario())
+    assert set(backend._buckets) == {"register_ip:b", "login_ip:c"}
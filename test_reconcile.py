@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import blobs
+import models
+import reconcile
+import storage
+from blobs import blob_key
+from config import settings
+from database import SessionLocal, async_engine, writer_engine
+
+LATER = time.time() + 2 * settings.reconcile_grace  # every file written by the test is past the grace period
+EXPIRED = LATER + settings.reconcile_retention + 1
+
+
+def _arun(coroutine):
+    # Pooled aiosqlite connections belong to the loop that opened them
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+            if writer_engine is not None:
+                await writer_engine.dispose()
+    return asyncio.run(run())
+
+
+def _put(key, content):
+    asyncio.run(storage.backend.put(key, content))
+
+
+def _keys():
+    return sorted(key for key, _ in asyncio.run(storage.backend.list_keys()))
+
+
+def _run(now, limit=2):
+    return _arun(reconcile.run_pass(now=now, limit=limit))
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch, seed):
+    monkeypatch.setattr(storage, "backend", storage.LocalStorage(str(tmp_path)))
+    n = seed.unique()
+    content = f"document {n}".encode()
+    sha = hashlib.sha256(content).hexdigest()
+    used = {
+        blob_key(sha): content,
+        "legacy/report.pdf": b"legacy",
+        f"logos/team_{n}_new.png": b"new logo",
+        f"logos/team_{n}_new.png.gz": b"gzipped",
+        f"logos/v/{n}abc-small.webp": b"variant",
+        reconcile._url_key(models.DEFAULT_LOGO_URL): b"default",
+    }
+    orphans = {
+        blob_key("f" * 64): b"failed commit",
+        f"logos/team_{n}_old.png": b"old logo",
+        f"logos/team_{n}_old.png.br": b"old br",
+        "logos/v/stale-small.webp": b"stale",
+    }
+    for key, value in {**used, **orphans}.items():
+        _put(key, value)
+
+    seed.db.query(models.ReconcileState).update({
+        "cursor": None, "reclaimed_bytes": 0, "lease_owner": None, "lease_expires_at": None,
+    })
+    team = seed.team(
+        "Reconcile team",
+        logo_url=f"/uploads/logos/team_{n}_new.png",
+        logo_variants={"small": {"webp": f"/uploads/logos/v/{n}abc-small.webp"}},
+    )
+    user = seed.user(full_name="Owner")
+    seed.db.add(models.Blob(sha256=sha, path=blob_key(sha), size=len(content), ref_count=1))
+    seed.db.add_all([
+        models.Document(team_id=team.id, filename="a.pdf", file_path=blob_key(sha), uploaded_by=user.id),
+        models.Document(team_id=team.id, filename="b.pdf", file_path="legacy/report.pdf", uploaded_by=user.id),
+    ])
+    seed.db.commit()
+    return used, orphans, team.id, user.id
+
+
+def test_orphans_are_quarantined_then_deleted(tree):
+    used, orphans, _, _ = tree
+    report = _run(LATER)
+    assert report.scanned == len(used) + len(orphans)
+    assert report.quarantined == len(orphans)
+    assert report.quarantined_bytes == sum(map(len, orphans.values()))
+    assert _keys() == sorted([*used, *(reconcile.quarantine_key(key, LATER) for key in orphans)])
+
+    # Nothing is deleted before the retention, and quarantine is not rescanned
+    report = _run(LATER + 60)
+    assert (report.scanned, report.quarantined, report.deleted) == (len(used), 0, 0)
+
+    report = _run(EXPIRED)
+    assert report.deleted == len(orphans)
+    assert report.reclaimed_bytes == sum(map(len, orphans.values()))
+    assert _keys() == sorted(used)
+
+    db = SessionLocal()
+    try:
+        state = db.get(models.ReconcileState, 1)
+        assert state.cursor is None
+        assert state.reclaimed_bytes == report.reclaimed_bytes
+    finally:
+        db.close()
+
+
+def test_young_files_are_left_alone(tree):
+    _, orphans, _, _ = tree
+    young = storage.backend.local_path("logos/uploading.png")
+    _put("logos/uploading.png", b"in flight")
+    os.utime(young, (LATER, LATER))
+    _run(LATER)
+    assert os.path.exists(young)
+
+
+def test_quarantined_file_in_use_again_is_restored(tree):
+    _, orphans, team_id, user_id = tree
+    _run(LATER)
+    old_logo = next(key for key in orphans if key.endswith("_old.png"))
+    db = SessionLocal()
+    try:
+        db.add(models.Document(team_id=team_id, filename="old.png", file_path=old_logo, uploaded_by=user_id))
+        db.commit()
+    finally:
+        db.close()
+
+    report = _run(EXPIRED)
+    # The file and its precompressed sibling, which is in use again too
+    assert report.restored == 2
+    assert report.deleted == len(orphans) - 2
+    assert asyncio.run(storage.backend.get(old_logo)) == orphans[old_logo]
+
+
+def test_restore_keeps_a_file_stored_again_under_the_same_key(tree):
+    _, orphans, team_id, _ = tree
+    _run(LATER)
+    old_logo = next(key for key in orphans if key.endswith("_old.png"))
+    # The team uploads a logo with the same name again
+    _put(old_logo, b"brand new logo")
+    db = SessionLocal()
+    try:
+        db.get(models.Team, team_id).logo_url = f"/uploads/{old_logo}"
+        db.commit()
+    finally:
+        db.close()
+
+    report = _run(EXPIRED)
+    assert asyncio.run(storage.backend.get(old_logo)) == b"brand new logo"
+    assert report.deleted == len(orphans) - 1
+    assert reconcile.quarantine_key(old_logo, LATER) not in _keys()
+
+
+def test_interrupted_pass_resumes(tree):
+    used, orphans, _, _ = tree
+    first, done = _arun(reconcile.run_batch(now=LATER, limit=3))
+    assert (first.scanned, done) == (3, False)
+    rest = _run(LATER, limit=3)
+    assert first.scanned + rest.scanned == len(used) + len(orphans)
+    assert first.quarantined + rest.quarantined == len(orphans)
+
+
+def test_dry_run_changes_nothing(tree):
+    used, orphans, _, _ = tree
+    before = _keys()
+    report = _arun(reconcile.run_pass(now=LATER, limit=2, dry_run=True))
+    assert report.quarantined == len(orphans)
+    assert _keys() == before
+
+
+def test_batches_take_turns_under_a_lease(tree):
+    db = SessionLocal()
+    try:
+        state = db.get(models.ReconcileState, 1)
+        state.lease_owner, state.lease_expires_at = "other-worker", datetime.utcnow() + timedelta(minutes=5)
+        db.commit()
+        assert _arun(reconcile.run_batch(now=LATER)) is None
+        assert _run(LATER) is None
+        assert state.cursor is None
+
+        # A lease left behind by a crashed process lapses
+        state.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        report, done = _arun(reconcile.run_batch(now=LATER))
+        assert done and report.quarantined == len(tree[1])
+        db.refresh(state)
+        assert state.lease_owner is None
+    finally:
+        db.close()
+
+
+def test_blob_quarantined_during_an_upload_is_stored_again(client, seed, monkeypatch):
+    headers = seed.headers(seed.user(team=seed.team("Reconcile team")))
+    content = f"reused {seed.unique()}".encode()
+    key = blob_key(hashlib.sha256(content).hexdigest())
+    _put(key, content)  # left by a released blob
+    quarantined = reconcile.quarantine_key(key, LATER)
+    is_stored = blobs._is_stored
+
+    async def quarantined_after_check(*args):
+        # The reconciler moves the file before the new reference is committed
+        stored = await is_stored(*args)
+        await storage.backend.move(key, quarantined)
+        return stored
+
+    monkeypatch.setattr(blobs, "_is_stored", quarantined_after_check)
+    response = client.post("/api/documents/upload", headers=headers, files={"file": ("deck.pdf", content)})
+    assert response.status_code == 200
+    assert asyncio.run(storage.backend.get(key)) == content
+
+    # The reconciler's recheck then drops its copy
+    assert asyncio.run(reconcile._restore(quarantined, key)) is False
+    assert asyncio.run(storage.backend.stat(quarantined)) is None
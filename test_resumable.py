@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+import models
+import storage
+import upload_sessions
+from auth import create_access_token
+from config import settings
+from database import SessionLocal
+
+
+@pytest.fixture
+def student(seed):
+    return seed.headers(seed.user(team=seed.team("Resumable team"), full_name="Uploader"))
+
+
+def test_upload_resumes_after_a_dropped_chunk(client, student):
+    content = os.urandom(300_000)
+    response = client.post("/api/uploads", headers=student, json={"filename": "demo.mp4", "size": len(content)})
+    assert response.status_code == 201
+    upload_id = response.json()["id"]
+    url = f"/api/uploads/{upload_id}"
+
+    response = client.put(url, headers={**student, "Upload-Offset": "0"}, content=content[:100_000])
+    assert response.json()["offset"] == 100_000
+
+    # A retry from a stale offset is refused with the offset to resume from
+    response = client.put(url, headers={**student, "Upload-Offset": "0"}, content=content[:100_000])
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "100000"
+
+    assert client.get(url, headers=student).headers["Upload-Offset"] == "100000"
+    assert client.post(f"{url}/complete", headers=student).status_code == 409
+
+    response = client.put(url, headers={**student, "Upload-Offset": "100000"}, content=content[100_000:])
+    assert response.json()["offset"] == len(content)
+
+    response = client.post(f"{url}/complete", headers=student)
+    assert response.status_code == 200
+    assert response.json()["filename"] == "demo.mp4"
+    db = SessionLocal()
+    try:
+        document = db.get(models.Document, response.json()["id"])
+        assert document.sha256 == hashlib.sha256(content).hexdigest()
+        with open(storage.backend.local_path(document.file_path), "rb") as f:
+            assert f.read() == content
+    finally:
+        db.close()
+    assert client.get(url, headers=student).status_code == 404
+
+
+def test_chunks_cannot_exceed_declared_size(client, student):
+    upload_id = client.post("/api/uploads", headers=student, json={"filename": "a.pdf", "size": 10}).json()["id"]
+    response = client.put(f"/api/uploads/{upload_id}", headers={**student, "Upload-Offset": "0"}, content=b"x" * 11)
+    assert response.status_code == 400
+
+
+def test_sessions_are_private_and_expire(client, student):
+    upload_id = client.post("/api/uploads", headers=student, json={"filename": "a.pdf", "size": 10}).json()["id"]
+    other = {"Authorization": f"Bearer {create_access_token({'sub': '999999'})}"}
+    assert client.get(f"/api/uploads/{upload_id}", headers=other).status_code in (401, 404)
+
+    session = upload_sessions.load(upload_id)
+    stale = time.time() - settings.upload_session_ttl - 1
+    os.utime(session.data_path, (stale, stale))
+    os.utime(session.meta_path, (stale, stale))
+    os.utime(session.directory, (stale, stale))
+
+    async def sweep():
+        sweeper = asyncio.create_task(upload_sessions.run_forever(0.01))
+        await asyncio.sleep(0.2)
+        sweeper.cancel()
+
+    asyncio.run(sweep())
+    assert not os.path.exists(session.directory)
+    assert client.get(f"/api/uploads/{upload_id}", headers=student).status_code == 404
+
+
+def test_one_request_at_a_time_per_session(client, student):
+    content = os.urandom(1000)
+    upload_id = client.post("/api/uploads", headers=student, json={"filename": "a.pdf", "size": len(content)}).json()["id"]
+    url = f"/api/uploads/{upload_id}"
+    assert client.put(url, headers={**student, "Upload-Offset": "0"}, content=content).status_code == 200
+
+    # Held by another request of this worker
+    held = upload_sessions.lock(upload_sessions.load(upload_id))
+    try:
+        assert client.put(url, headers={**student, "Upload-Offset": "1000"}, content=b"").status_code == 409
+        assert client.post(f"{url}/complete", headers=student).status_code == 409
+        assert client.delete(url, headers=student).status_code == 409
+    finally:
+        held.release()
+
+    if upload_sessions.fcntl is not None:
+        # Held by another worker process
+        with open(upload_sessions.load(upload_id).lock_path, "a") as other_worker:
+            upload_sessions.fcntl.flock(other_worker, upload_sessions.fcntl.LOCK_EX)
+            assert client.post(f"{url}/complete", headers=student).status_code == 409
+
+    assert client.post(f"{url}/complete", headers=student).status_code == 200
+    assert client.post(f"{url}/complete", headers=student).status_code == 404
+
+
+def test_lock_on_a_completed_session(client, student):
+    upload_id = client.post("/api/uploads", headers=student, json={"filename": "a.pdf", "size": 10}).json()["id"]
+    session = upload_sessions.load(upload_id)
+    # A request that loaded the session just before it was completed
+    upload_sessions.discard(session)
+    assert upload_sessions.lock(session) is None
+    os.makedirs(session.directory)
+    assert upload_sessions.lock(session) is None
+    upload_sessions.discard(session)
@@ -0,0 +1,110 @@
+import io
+import zipfile
+
+import pytest
+
+import search
+
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DRAWING_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
+
+def _zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _docx(*paragraphs) -> bytes:
+    # Each paragraph is a list of runs
+    body = "".join(
+        "<w:p>" + "".join(f"<w:r><w:t>{run}</w:t></w:r>" for run in runs) + "</w:p>"
+        for runs in paragraphs
+    )
+    return _zip({"word/document.xml": f'<w:document xmlns:w="{WORD_NS}"><w:body>{body}</w:body></w:document>'})
+
+
+def _pptx(*slides) -> bytes:
+    return _zip({
+        f"ppt/slides/slide{n}.xml": f'<p:sld xmlns:p="urn:p" xmlns:a="{DRAWING_NS}"><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:sld>'
+        for n, text in slides
+    })
+
+
+def _pdf(text: str) -> bytes:
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for n, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def test_extract_docx_joins_runs_and_separates_paragraphs():
+    assert search.extract_text("report.docx", _docx(["Hydro", "ponic"], ["greenhouse"])) == "Hydroponic greenhouse"
+
+
+def test_extract_pptx_in_slide_order():
+    assert search.extract_text("deck.PPTX", _pptx((10, "ten"), (2, "two"), (1, "one"))) == "one two ten"
+
+
+def test_extract_pdf():
+    pytest.importorskip("pypdf")
+    assert search.extract_text("paper.pdf", _pdf("Precision livestock farming")) == "Precision livestock farming"
+
+
+def test_unreadable_and_legacy_files_have_no_text():
+    assert search.extract_text("broken.docx", b"not a zip") == ""
+    assert search.extract_text("old.doc", b"\xd0\xcf\x11\xe0") == ""
+
+
+def test_terms():
+    assert search.terms("Élevage, bovins & IoT!") == ["élevage", "bovins", "iot"]
+    assert search.terms("*** --") == []
+
+
+@pytest.fixture
+def teams(seed):
+    team = seed.team("Search team")
+    student = seed.user(team=team)
+    outsider = seed.user(team=seed.team("Other search team"), full_name="Outsider")
+    return seed.unique(), team.id, *(seed.headers(user) for user in (student, outsider, seed.admin()))
+
+
+def test_search_endpoint(client, teams):
+    n, team_id, student, outsider, admin = teams
+    word = f"aquaponie{n}x"
+    in_name = client.post("/api/documents/upload", headers=student,
+                          files={"file": (f"{word}.docx", _docx(["Rapport final"]))}).json()
+    in_content = client.post("/api/documents/upload", headers=student,
+                             files={"file": ("rapport.docx", _docx(["Système d'", word, " en serre"]))}).json()
+
+    def ids(response):
+        assert response.status_code == 200
+        return [d["id"] for d in response.json()]
+
+    # Content is indexed by the background task; a name match ranks first
+    assert ids(client.get("/api/documents/search", params={"q": word[:-2]}, headers=admin)) == [in_name["id"], in_content["id"]]
+    assert ids(client.get("/api/documents/search", params={"q": f"serre {word}"}, headers=student)) == [in_content["id"]]
+    assert client.get("/api/documents/search", params={"q": word}, headers=student).json()[0]["uploader_name"] == "Student"
+
+    # Students only see their own team
+    assert ids(client.get("/api/documents/search", params={"q": word}, headers=outsider)) == []
+    assert client.get("/api/documents/search", params={"q": word, "team_id": team_id}, headers=outsider).status_code == 403
+    assert ids(client.get("/api/documents/search", params={"q": "---"}, headers=admin)) == []
+
+    assert ids(client.get("/api/documents/search", params={"q": word, "status": "approved"}, headers=admin)) == []
@@ -0,0 +1,34 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import Response
+
+import models
+import schemas
+from serializers import dump_list, json_list_response, list_adapter
+
+
+def test_rows_render_like_response_model():
+    row = SimpleNamespace(
+        id=1, team_id=2, filename="doc.pdf", uploaded_by=3, uploaded_at=datetime(2024, 1, 2, 3, 4, 5),
+        status=models.DocumentStatus.PENDING, admin_comment=None, uploader_name="Student",
+    )
+    expected = [schemas.DocumentResponse.model_validate(row).model_dump(mode="json")]
+    assert json.loads(dump_list(schemas.DocumentResponse, [row])) == expected
+    assert expected[0]["status"] == "pending"
+    assert expected[0]["uploaded_at"] == "2024-01-02T03:04:05"
+
+
+def test_adapters_are_cached():
+    assert list_adapter(schemas.UserResponse) is list_adapter(schemas.UserResponse)
+
+
+def test_response_keeps_injected_headers():
+    injected = Response()
+    del injected.headers["content-length"]
+    injected.headers["X-Next-Cursor"] = "abc"
+    response = json_list_response(schemas.DocumentResponse, [], injected)
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.headers["content-type"] == "application/json"
+    assert response.body == b"[]"
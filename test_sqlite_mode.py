@@ -0,0 +1,31 @@
+import asyncio
+
+from sqlalchemy import func, select, text
+
+from database import Base, create_sqlite_engines, make_async_sessionmaker
+import models
+
+
+def test_tuned_sqlite_routes_writes_to_single_writer(tmp_path):
+    async def scenario():
+        sync_engine, reader_engine, writer_engine = create_sqlite_engines(str(tmp_path / "app.db"))
+        Base.metadata.create_all(bind=sync_engine)
+        session_factory = make_async_sessionmaker(reader_engine, writer_engine)
+
+        async def add_team(i):
+            async with session_factory() as db:
+                db.add(models.Team(name=f"Team {i}"))
+                await db.commit()
+
+        try:
+            await asyncio.gather(*[add_team(i) for i in range(20)])
+            async with session_factory() as db:
+                journal_mode = await db.scalar(text("PRAGMA journal_mode"))
+                count = await db.scalar(select(func.count(models.Team.id)))
+            return journal_mode, count, writer_engine.pool.size()
+        finally:
+            await reader_engine.dispose()
+            await writer_engine.dispose()
+            sync_engine.dispose()
+
+    assert asyncio.run(scenario()) == ("wal", 20, 1)
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, exc, text
+
+import main
+import migrations
+from database import async_engine
+
+
+def test_upgrade_is_recorded_and_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert migrations.upgrade(engine) == [name for _, name, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(engine) == []
+    with engine.connect() as conn:
+        assert migrations.check_version(conn) == migrations.LATEST_VERSION
+
+
+def test_outdated_schema_is_refused(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    with engine.connect() as conn, pytest.raises(RuntimeError):
+        migrations.check_version(conn)
+
+
+def test_null_timestamps_are_backfilled_then_refused(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'nulls.db'}")
+    migrations.upgrade(engine, target=10)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO teams (name, created_at, updated_at) VALUES ('Old team', NULL, NULL)"))
+    migrations.upgrade(engine)
+
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT created_at FROM teams")).scalar() is not None
+        with pytest.raises(exc.IntegrityError):
+            conn.execute(text("INSERT INTO teams (name, created_at) VALUES ('New team', NULL)"))
+        with pytest.raises(exc.IntegrityError):
+            conn.execute(text("UPDATE teams SET created_at = NULL"))
+
+
+def test_windows_upload_paths_become_storage_keys(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'paths.db'}")
+    migrations.upgrade(engine, target=6)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO documents (team_id, filename, file_path, uploaded_by) VALUES (1, 'a.pdf', :path, 1)"),
+            [{"path": "uploads\\old\\a.pdf"}, {"path": "uploads/b.pdf"}],
+        )
+        conn.execute(text("INSERT INTO blobs (sha256, path, size, ref_count) VALUES ('ab', :path, 1, 1)"),
+                     {"path": "uploads\\blobs\\ab\\ab"})
+    migrations.upgrade(engine, target=7)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT file_path FROM documents ORDER BY id")).scalars().all() == ["old/a.pdf", "b.pdf"]
+        assert conn.execute(text("SELECT path FROM blobs")).scalar() == "blobs/ab/ab"
+
+
+def test_startup_only_checks_schema_version(migrated_db):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        start = time.perf_counter()
+        with TestClient(main.app):
+            elapsed = time.perf_counter() - start
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    assert not [s for s in statements if s.lstrip().upper().startswith(("CREATE", "ALTER"))]
+    assert len(statements) <= 3
+    assert elapsed < 1.0, f"startup took {elapsed:.3f} s"
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event
+
+import models
+import stats
+from database import SessionLocal, async_engine
+
+
+@pytest.fixture
+def stats_enabled(seed, monkeypatch):
+    monkeypatch.setattr(stats.settings, "use_stats_table", True)
+    team, admin, student = seed.team("Stats team"), seed.admin(), seed.user()
+    document = models.Document(team_id=team.id, filename="a.pdf", file_path="uploads/a.pdf", uploaded_by=admin.id)
+    seed.db.add(document)
+    seed.db.commit()
+    stats.rebuild(seed.db)
+    return seed.db, seed.headers(admin), document.id, student.id
+
+
+def test_counters_follow_writes_and_match_checker(client, stats_enabled):
+    db, headers, doc_id, student_id = stats_enabled
+
+    assert client.put(f"/api/documents/{doc_id}/validate", headers=headers, json={"status": "rejected"}).status_code == 200
+    assert client.put(f"/api/admin/users/{student_id}", headers=headers, json={"role": "admin"}).status_code == 200
+    assert client.put(f"/api/admin/users/{student_id}", headers=headers, json={"role": "student"}).status_code == 200
+    assert client.delete(f"/api/admin/users/{student_id}", headers=headers).status_code == 200
+
+    db.expire_all()
+    assert stats.check(db) == {}
+    dashboard = client.get("/api/admin/dashboard", headers=headers).json()
+    row = db.get(models.Stats, 1)
+    assert dashboard["rejected_documents"] == row.rejected_documents
+    assert dashboard["total_documents"] == row.pending_documents + row.approved_documents + row.rejected_documents
+
+
+def test_concurrent_validations_count_once(client, stats_enabled):
+    db, headers, doc_id, _ = stats_enabled
+    approved = []
+
+    def approve_elsewhere(conn, cursor, statement, parameters, context, executemany):
+        # Another admin approves the document right after this request read it
+        if approved or not statement.lstrip().startswith("SELECT") or "FROM documents" not in statement:
+            return
+        approved.append(doc_id)
+        other = SessionLocal()
+        try:
+            other.get(models.Document, doc_id).status = models.DocumentStatus.APPROVED
+            other.get(models.Stats, 1).pending_documents -= 1
+            other.get(models.Stats, 1).approved_documents += 1
+            other.commit()
+        finally:
+            other.close()
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", approve_elsewhere)
+    try:
+        response = client.put(f"/api/documents/{doc_id}/validate", headers=headers, json={"status": "rejected"})
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", approve_elsewhere)
+
+    assert approved and response.status_code == 409
+    db.expire_all()
+    assert db.get(models.Document, doc_id).status == models.DocumentStatus.APPROVED
+    assert stats.check(db) == {}
@@ -0,0 +1,145 @@
+import asyncio
+import os
+
+import pytest
+
+from storage import LocalStorage, S3Storage
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        yield LocalStorage(str(tmp_path))
+        return
+    # S3 is exercised against moto's in-process stand-in
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    mock = moto.mock_aws() if hasattr(moto, "mock_aws") else moto.mock_s3()
+    with mock:
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-bucket")
+        yield S3Storage("test-bucket", prefix="app", client=client)
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_write_stat_stream_delete(backend):
+    async def scenario():
+        size = await backend.write("blobs/ab/abc", _chunks(b"hello ", b"world"))
+        stat = await backend.stat("blobs/ab/abc")
+        whole = await backend.get("blobs/ab/abc")
+        middle = b"".join([c async for c in backend.stream("blobs/ab/abc", 2, 7)])
+        await backend.delete("blobs/ab/abc")
+        await backend.delete("blobs/ab/abc")  # missing keys are ignored
+        return size, stat.size, whole, middle, await backend.stat("blobs/ab/abc")
+
+    assert asyncio.run(scenario()) == (11, 11, b"hello world", b"llo wo", None)
+
+
+def test_failed_write_stores_nothing(backend):
+    async def failing():
+        yield b"partial"
+        raise RuntimeError("client went away")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await backend.write("logos/x.png", failing())
+        return await backend.stat("logos/x.png")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_put_file_leaves_the_source(backend, tmp_path):
+    src = tmp_path / "finished.part"
+    src.write_bytes(b"resumed upload")
+
+    async def scenario():
+        await backend.put_file("blobs/cd/cdef", str(src))
+        return await backend.get("blobs/cd/cdef")
+
+    assert asyncio.run(scenario()) == b"resumed upload"
+    assert src.read_bytes() == b"resumed upload"
+
+
+def test_local_keys_stay_inside_root(tmp_path):
+    backend = LocalStorage(str(tmp_path))
+    assert backend.local_path("logos/a.png") == os.path.join(str(tmp_path), "logos", "a.png")
+    with pytest.raises(ValueError):
+        backend.local_path("../outside")
+
+
+def test_list_keys_in_order_and_resumable(backend):
+    keys = ["docs/a-b", "docs/a/x", "docs/a/y", "docs/b", "docs/c/d/e", "other/z"]
+
+    async def scenario():
+        for key in reversed(keys):
+            await backend.put(key, key.encode())
+        everything = [key for key, _ in await backend.list_keys("docs/")]
+        pages, cursor = [], ""
+        while True:
+            page = await backend.list_keys("docs/", start_after=cursor, limit=2)
+            if not page:
+                break
+            pages.append([key for key, _ in page])
+            cursor = page[-1][0]
+        sizes = {key: stat.size for key, stat in await backend.list_keys("docs/a/")}
+        return everything, pages, sizes
+
+    everything, pages, sizes = asyncio.run(scenario())
+    assert everything == keys[:5]
+    assert pages == [keys[0:2], keys[2:4], keys[4:5]]
+    assert sizes == {"docs/a/x": 8, "docs/a/y": 8}
+
+
+def test_move(backend):
+    async def scenario():
+        await backend.put("logos/old.png", b"logo")
+        await backend.move("logos/old.png", "quarantine/1/logos/old.png")
+        with pytest.raises(FileNotFoundError):
+            await backend.move("logos/old.png", "elsewhere")
+        return await backend.stat("logos/old.png"), await backend.get("quarantine/1/logos/old.png")
+
+    assert asyncio.run(scenario()) == (None, b"logo")
+
+
+def test_incomplete_backend_cannot_be_created():
+    from storage import StorageBackend
+
+    class WriteOnly(StorageBackend):
+        async def write(self, key, chunks):
+            return 0
+
+    with pytest.raises(TypeError):
+        WriteOnly()
+
+
+def test_uploads_mount_only_serves_logos(client, seed, monkeypatch, tmp_path):
+    import storage
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.testclient import TestClient
+
+    from downloads import StorageFiles
+
+    headers = seed.headers(seed.user(team=seed.team("Mount team")))
+    content = os.urandom(1000)
+    doc_id = client.post("/api/documents/upload", headers=headers, files={"file": ("secret.pdf", content)}).json()["id"]
+    key = client.get(f"/api/documents/{doc_id}/download", headers=headers).headers["etag"].strip('"')
+    asyncio.run(storage.backend.put("logos/team_mount.png", b"PNG"))
+    asyncio.run(storage.backend.put("quarantine/20240101T000000Z/blobs/old", b"old"))
+
+    assert client.get("/uploads/logos/team_mount.png").content == b"PNG"
+    assert client.get(f"/uploads/blobs/{key[:2]}/{key}").status_code == 404
+    assert client.get(f"/uploads/logos/../blobs/{key[:2]}/{key}").status_code == 404
+    assert client.get("/uploads/quarantine/20240101T000000Z/blobs/old").status_code == 404
+
+    # Same rule when logos are served from a bucket
+    monkeypatch.setattr(storage, "backend", LocalStorage(str(tmp_path)))
+    asyncio.run(storage.backend.put("logos/a.png", b"PNG"))
+    asyncio.run(storage.backend.put("blobs/ab/abc", b"document"))
+    files = TestClient(Starlette(routes=[Mount("/uploads", StorageFiles(public_prefixes=["logos/"]))]))
+    assert files.get("/uploads/logos/a.png").status_code == 200
+    assert files.get("/uploads/blobs/ab/abc").status_code == 404
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+import models
+import storage
+import uploads
+from database import SessionLocal
+from routes.teams import MAX_LOGO_SIZE
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "backend", storage.LocalStorage(str(tmp_path)))
+    return tmp_path
+
+
+def _save(content, max_size):
+    upload = UploadFile(io.BytesIO(content), filename="report.pdf")
+    return asyncio.run(uploads.save_upload(upload, "docs/report.pdf", max_size))
+
+
+def test_upload_is_streamed_hashed_and_renamed(local_storage):
+    content = os.urandom(uploads.CHUNK_SIZE * 3 + 17)
+    stored = _save(content, max_size=len(content))
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest()
+    assert (local_storage / "docs" / "report.pdf").read_bytes() == content
+    assert os.listdir(local_storage / "docs") == ["report.pdf"]
+
+
+def test_oversized_upload_leaves_nothing_behind(local_storage):
+    with pytest.raises(HTTPException) as exc:
+        _save(b"x" * (uploads.CHUNK_SIZE * 2), max_size=uploads.CHUNK_SIZE)
+    assert exc.value.status_code == 400
+    assert os.listdir(local_storage / "docs") == []
+
+
+def test_client_filename_cannot_escape_directory():
+    assert uploads.safe_filename("../../etc/passwd") == "passwd"
+    assert uploads.safe_filename("..\\..\\evil.pdf") == "evil.pdf"
+    assert uploads.safe_filename("") == "upload"
+
+
+@pytest.fixture
+def student(seed):
+    user = seed.user(team=seed.team("Upload team"), full_name="Uploader")
+    return user.id, seed.headers(user)
+
+
+def test_document_upload_records_size_and_checksum(client, student):
+    user_id, headers = student
+    content = b"%PDF-1.4 " + os.urandom(100_000)
+    response = client.post("/api/documents/upload", headers=headers, files={"file": ("slides.pdf", content)})
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        document = db.get(models.Document, response.json()["id"])
+        assert document.size == len(content)
+        assert document.sha256 == hashlib.sha256(content).hexdigest()
+        assert asyncio.run(storage.backend.get(document.file_path)) == content
+    finally:
+        db.close()
+
+
+def test_logo_upload_is_size_limited(client, student):
+    _, headers = student
+    response = client.post("/api/teams/logo", headers=headers, files={"file": ("big.gif", b"x" * (MAX_LOGO_SIZE + 1))})
+    assert response.status_code == 400
+    response = client.post("/api/teams/logo", headers=headers, files={"file": ("small.gif", b"GIF89a")})
+    assert response.status_code == 200
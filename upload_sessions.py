@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import IO, Optional
+
+import anyio
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: requests are only serialized within one process
+    fcntl = None
+
+# On-disk state of resumable uploads: <upload_session_dir>/<id>/meta.json
+# (owner, target file name, declared size) and data.part (bytes received so
+# far). The current offset is the size of data.part, and a session expires
+# upload_session_ttl seconds after its last write. Only one request at a
+# time may write to or complete a session (see lock()). Everything here but
+# run_forever is blocking file I/O; routes call it through a worker thread.
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+logger = logging.getLogger(__name__)
+
+_held = set()  # ids of the sessions locked by this process
+_held_lock = threading.Lock()
+
+
+class SessionBusy(Exception):
+    pass
+
+
+@dataclass
+class UploadSession:
+    id: str
+    user_id: int
+    filename: str
+    size: int
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(settings.upload_session_dir, self.id)
+
+    @property
+    def data_path(self) -> str:
+        return os.path.join(self.directory, "data.part")
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def lock_path(self) -> str:
+        return os.path.join(self.directory, "lock")
+
+    def offset(self) -> int:
+        return os.stat(self.data_path).st_size
+
+    def expires_at(self) -> datetime:
+        return datetime.utcfromtimestamp(os.stat(self.data_path).st_mtime + settings.upload_session_ttl)
+
+    def expired(self) -> bool:
+        return os.stat(self.data_path).st_mtime + settings.upload_session_ttl < time.time()
+
+
+def create(user_id: int, filename: str, size: int) -> UploadSession:
+    session = UploadSession(id=uuid.uuid4().hex, user_id=user_id, filename=filename, size=size)
+    os.makedirs(session.directory)
+    open(session.data_path, "wb").close()
+    tmp_path = session.meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(asdict(session), f)
+    os.replace(tmp_path, session.meta_path)
+    return session
+
+
+def load(session_id: str) -> Optional[UploadSession]:
+    if not SESSION_ID.match(session_id):
+        return None
+    try:
+        with open(os.path.join(settings.upload_session_dir, session_id, "meta.json")) as f:
+            session = UploadSession(**json.load(f))
+        if session.expired():
+            discard(session)
+            return None
+    except (FileNotFoundError, ValueError, TypeError):
+        return None
+    return session
+
+
+class SessionLock:
+    def __init__(self, session_id: str, handle: IO):
+        self.session_id = session_id
+        self.handle = handle
+
+    def release(self):
+        # Closing the file drops the flock
+        self.handle.close()
+        with _held_lock:
+            _held.discard(self.session_id)
+
+
+def lock(session: UploadSession) -> Optional[SessionLock]:
+    # Exclusive lock on the session for the length of one request, taken
+    # without waiting: raises SessionBusy while another request (in any
+    # worker) holds it. None when the session was completed or discarded
+    # meanwhile.
+    with _held_lock:
+        if session.id in _held:
+            raise SessionBusy(session.id)
+        _held.add(session.id)
+    try:
+        handle = open(session.lock_path, "a")
+    except FileNotFoundError:
+        with _held_lock:
+            _held.discard(session.id)
+        return None
+    held = SessionLock(session.id, handle)
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            held.release()
+            raise SessionBusy(session.id)
+    if not (os.path.exists(session.meta_path) and os.path.exists(session.data_path)):
+        held.release()
+        return None
+    return held
+
+
+def discard(session: UploadSession):
+    shutil.rmtree(session.directory, ignore_errors=True)
+
+
+def purge_expired() -> int:
+    purged = 0
+    try:
+        session_ids = os.listdir(settings.upload_session_dir)
+    except FileNotFoundError:
+        return 0
+    for session_id in session_ids:
+        directory = os.path.join(settings.upload_session_dir, session_id)
+        try:
+            paths = [directory] + [os.path.join(directory, name) for name in os.listdir(directory)]
+            last_write = max(os.stat(path).st_mtime for path in paths)
+        except OSError:
+            continue
+        if last_write + settings.upload_session_ttl < time.time():
+            shutil.rmtree(directory, ignore_errors=True)
+            purged += 1
+    return purged
+
+
+async def run_forever(interval: int):
+    # Background loop started by main.py: removes the part files of
+    # abandoned sessions, which nothing else would look at again
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await anyio.to_thread.run_sync(purge_expired)
+        except Exception:
+            logger.exception("Upload session sweep failed")
+            continue
+        if purged:
+            logger.info("Purged %d expired upload sessions", purged)
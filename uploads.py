@@ -0,0 +1,51 @@
+import hashlib
+import os
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile, status
+
+import storage
+
+# Uploads are copied to the storage backend in fixed-size chunks, hashed on
+# the way, and only become visible once complete (see StorageBackend.write).
+# Memory per upload stays at one chunk (one part for S3), and oversized files
+# are abandoned at the first chunk past the limit.
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    key: str
+    size: int
+    sha256: str
+
+
+def safe_filename(filename: str) -> str:
+    # Client-supplied names must not escape the upload directory
+    return os.path.basename((filename or "").replace("\\", "/")) or "upload"
+
+
+def too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File too large. Maximum size: {max_size / 1024 / 1024} MB"
+    )
+
+
+async def save_upload(file: UploadFile, key: str, max_size: int) -> StoredUpload:
+    digest = hashlib.sha256()
+
+    async def chunks():
+        size = 0
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            size += len(chunk)
+            if size > max_size:
+                raise too_large(max_size)
+            digest.update(chunk)
+            yield chunk
+
+    size = await storage.backend.write(key, chunks())
+    return StoredUpload(key=key, size=size, sha256=digest.hexdigest())